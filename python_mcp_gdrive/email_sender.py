@@ -10,42 +10,115 @@ import os
 import json
 import smtplib
 import logging
+import base64
+import functools
+import mmap
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+from email import encoders
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 from email.utils import formatdate
-from typing import List, Optional, Dict, Union
+from typing import List, Optional, Dict, Union, Mapping
+
+# Optional accelerated JSON parsing; falls back to the stdlib if orjson
+# is not installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
-def load_config_from_file(config_path: str = 'config.json') -> Dict:
+# Attachments larger than this are mapped into memory instead of read into a
+# heap buffer, avoiding one full copy of the file while the MIME part encodes.
+_MMAP_THRESHOLD = 4 * 1024 * 1024
+
+# Inlined email bodies read the source file in chunks of this size and are
+# truncated beyond the cap (the full file still goes out as an attachment).
+_BODY_READ_CHUNK = 64 * 1024
+_MAX_INLINE_BODY = 1024 * 1024
+
+# Placeholder headers used by message templates (see EmailSender.make_template)
+_TEMPLATE_TO = '__TO__'
+_TEMPLATE_DATE = '__DATE__'
+
+# Paths computed once at import time instead of per send
+_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+_DEFAULT_DUMMY_STL = os.path.join(os.path.dirname(_MODULE_DIR), 'mcp_test', 'dummy.stl')
+_DEFAULT_DUMMY_STL_EXISTS = os.path.exists(_DEFAULT_DUMMY_STL)
+
+
+@functools.lru_cache(maxsize=64)
+def _encoded_attachment(file_path: str, mtime_ns: int, size: int) -> str:
+    """Read and base64-encode an attachment, cached on its stat signature.
+
+    Invariant attachments (e.g. dummy.stl sent with every email) are encoded
+    once instead of on every send; an mtime/size change invalidates the entry.
+    """
+    with open(file_path, 'rb') as f:
+        if size > _MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return base64.encodebytes(mm).decode('ascii')
+        return base64.encodebytes(f.read()).decode('ascii')
+
+@functools.lru_cache(maxsize=8)
+def _load_config_cached(config_path: str, mtime_ns: int, size: int) -> Mapping:
+    """Parse the config file once per (path, mtime, size) signature.
+
+    The mtime/size arguments only serve as cache keys so that edits to the
+    file invalidate the cached entry.
+    """
+    with open(config_path, 'rb') as f:
+        config = _json_loads(f.read())
+    return types.MappingProxyType(config.get('email', {}))
+
+
+def load_config_from_file(config_path: str = 'config.json') -> Mapping:
     """Load email configuration from a JSON file.
-    
+
+    The parsed config is memoized keyed on the file's path, mtime and size,
+    so repeated calls (e.g. in bulk-send loops) avoid re-reading and
+    re-parsing an unchanged file. The returned mapping is read-only.
+
     Args:
         config_path: Path to the configuration file
-        
+
     Returns:
-        Dict containing email configuration or empty dict if file not found
+        Mapping containing email configuration or empty dict if file not found
     """
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        return config.get('email', {})
+        abs_path = os.path.abspath(config_path)
+        stat = os.stat(abs_path)
+        return _load_config_cached(abs_path, stat.st_mtime_ns, stat.st_size)
     except Exception as e:
-        logger.error(f"Error loading config file: {e}")
+        logger.error("Error loading config file: %s", e)
         return {}
 
 
 class EmailConfig:
     """Email configuration settings."""
-    
+
+    __slots__ = (
+        'smtp_server',
+        'smtp_port',
+        'smtp_user',
+        'smtp_password',
+        'use_tls',
+        'sender_email',
+        'is_valid',
+    )
+
     def __init__(
         self,
         smtp_server: str = None,
         smtp_port: int = None,
         smtp_user: str = None,
         smtp_password: str = None,
-        use_tls: bool = True,
+        use_tls: bool = None,
         sender_email: str = None,
         config_file: str = None
     ):
@@ -62,28 +135,111 @@ class EmailConfig:
         self.smtp_port = smtp_port or config.get('smtp_port') or int(os.environ.get("SMTP_PORT", "587"))
         self.smtp_user = smtp_user or config.get('smtp_user') or os.environ.get("SMTP_USER")
         self.smtp_password = smtp_password or config.get('smtp_password') or os.environ.get("SMTP_PASSWORD")
-        self.use_tls = use_tls if use_tls is not None else config.get('use_tls', True) if 'use_tls' in config else (os.environ.get("SMTP_USE_TLS", "true").lower() == "true")
+        # use_tls=None means "unset", so a config.json with "use_tls": false
+        # (or SMTP_USE_TLS=false) is honored instead of being forced to True
+        if use_tls is not None:
+            self.use_tls = use_tls
+        elif 'use_tls' in config:
+            self.use_tls = config['use_tls']
+        else:
+            self.use_tls = os.environ.get("SMTP_USE_TLS", "true").lower() == "true"
         self.sender_email = sender_email or config.get('sender_email') or os.environ.get("SENDER_EMAIL") or self.smtp_user
-    
+
+        # Validity is computed once here so the per-send hot path only
+        # checks a single precomputed flag
+        self.is_valid = bool(
+            self.smtp_server
+            and self.smtp_port
+            and self.smtp_user
+            and self.smtp_password
+            and self.sender_email
+        )
+
     @classmethod
     def from_config_file(cls, config_file: str = 'config.json') -> 'EmailConfig':
         """Create an EmailConfig instance from a config file.
-        
+
         Args:
             config_file: Path to the configuration file
-            
+
         Returns:
             EmailConfig instance with settings from the config file
         """
         return cls(config_file=config_file)
 
+    @classmethod
+    def from_args(cls, args) -> 'EmailConfig':
+        """Create an EmailConfig from parsed argparse arguments.
+
+        Recognizes the test scripts' argument names (server/port/user/
+        password/sender plus an optional config file path); anything not
+        supplied falls through to the config file and environment variables
+        via the normal precedence rules.
+
+        Args:
+            args: argparse.Namespace from one of the test scripts
+
+        Returns:
+            EmailConfig instance
+        """
+        return cls(
+            smtp_server=getattr(args, 'server', None),
+            smtp_port=getattr(args, 'port', None),
+            smtp_user=getattr(args, 'user', None),
+            smtp_password=getattr(args, 'password', None),
+            use_tls=getattr(args, 'use_tls', None),
+            sender_email=getattr(args, 'sender', None),
+            config_file=getattr(args, 'config', None),
+        )
+
 
 class EmailSender:
-    """Class to handle email sending functionality."""
-    
+    """Class to handle email sending functionality.
+
+    Keeps a single authenticated SMTP connection alive across sends so that
+    bulk loops pay for the TLS handshake and AUTH exchange only once. Use as
+    a context manager (or call close()) to release the connection.
+    """
+
     def __init__(self, config: EmailConfig):
         self.config = config
-    
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def _connect(self) -> smtplib.SMTP:
+        """Open and authenticate a new SMTP connection."""
+        server = smtplib.SMTP(self.config.smtp_server, self.config.smtp_port)
+        if self.config.use_tls:
+            server.starttls()
+        server.login(self.config.smtp_user, self.config.smtp_password)
+        return server
+
+    def _ensure_connection(self) -> smtplib.SMTP:
+        """Return a live authenticated connection, reconnecting if needed."""
+        if self._smtp is not None:
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPException, OSError):
+                logger.info("Cached SMTP connection went stale, reconnecting")
+                self.close()
+        self._smtp = self._connect()
+        return self._smtp
+
+    def close(self) -> None:
+        """Close the cached SMTP connection if one is open."""
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def __enter__(self) -> 'EmailSender':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
     def _create_message(
         self,
         to_email: str,
@@ -136,19 +292,24 @@ class EmailSender:
         filename = attachment.get('filename')
         content_type = attachment.get('content_type', 'application/octet-stream')
         
-        # Read file content
+        # Build the part from the memoized base64 payload so unchanged files
+        # (like the dummy STL) are read and encoded only once across sends
         try:
-            with open(file_path, 'rb') as f:
-                attachment_data = f.read()
-            
-            part = MIMEApplication(attachment_data, Name=filename)
+            stat = os.stat(file_path)
+            encoded = _encoded_attachment(
+                os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+            )
+
+            part = MIMEApplication('', Name=filename, _encoder=encoders.encode_noop)
+            part.set_payload(encoded)
+            part['Content-Transfer-Encoding'] = 'base64'
             part['Content-Disposition'] = f'attachment; filename="{filename}"'
             part['Content-Type'] = content_type
-            
+
             msg.attach(part)
-            logger.info(f"Attached file: {filename}")
+            logger.info("Attached file: %s", filename)
         except Exception as e:
-            logger.error(f"Failed to attach file {file_path}: {e}")
+            logger.error("Failed to attach file %s: %s", file_path, e)
             raise
     
     def send_email(
@@ -172,13 +333,7 @@ class EmailSender:
             bool: True if email was sent successfully, False otherwise
         """
         # Validate email configuration
-        if not all([
-            self.config.smtp_server,
-            self.config.smtp_port,
-            self.config.smtp_user,
-            self.config.smtp_password,
-            self.config.sender_email
-        ]):
+        if not self.config.is_valid:
             logger.error("Email configuration is incomplete. Check SMTP settings.")
             return False
         
@@ -190,21 +345,182 @@ class EmailSender:
         if cc_emails:
             recipients.extend(cc_emails)
         
-        # Send the email
+        # Send the email over the persistent connection
         try:
-            with smtplib.SMTP(self.config.smtp_server, self.config.smtp_port) as server:
-                if self.config.use_tls:
-                    server.starttls()
-                
-                server.login(self.config.smtp_user, self.config.smtp_password)
-                server.sendmail(self.config.sender_email, recipients, msg.as_string())
-                
-                logger.info(f"Email sent successfully to {to_email}")
-                return True
+            server = self._ensure_connection()
+            # send_message streams the MIME tree to the socket via
+            # BytesGenerator instead of materializing it with as_string()
+            server.send_message(msg, from_addr=self.config.sender_email, to_addrs=recipients)
+
+            logger.info("Email sent successfully to %s", to_email)
+            return True
         except Exception as e:
-            logger.error(f"Failed to send email: {e}")
+            logger.error("Failed to send email: %s", e)
+            self.close()
+            return False
+
+    def make_template(
+        self,
+        subject: str,
+        body: str,
+        attachments: Optional[List[Dict[str, str]]] = None,
+        cc_emails: Optional[List[str]] = None,
+    ) -> bytes:
+        """Build and serialize a reusable message template once.
+
+        The full MIME tree (including base64-encoded attachments) is built
+        and serialized a single time with placeholder To/Date headers;
+        send_templated then patches the placeholders per recipient instead
+        of rebuilding and re-encoding the whole message.
+
+        Returns:
+            Serialized message bytes with __TO__/__DATE__ placeholders
+        """
+        msg = self._create_message(_TEMPLATE_TO, subject, body, attachments, cc_emails)
+        msg.replace_header('Date', _TEMPLATE_DATE)
+        return msg.as_bytes()
+
+    def send_templated(
+        self,
+        template: bytes,
+        to_email: str,
+        cc_emails: Optional[List[str]] = None,
+    ) -> bool:
+        """Send a prebuilt template to one recipient.
+
+        Only the To and Date headers are patched (two bytes.replace calls);
+        the MIME tree and attachment encoding from make_template are reused
+        as-is. Pass the same cc_emails the template was built with so the
+        envelope matches the Cc header.
+
+        Returns:
+            bool: True if email was sent successfully, False otherwise
+        """
+        if not self.config.is_valid:
+            logger.error("Email configuration is incomplete. Check SMTP settings.")
             return False
 
+        payload = template.replace(_TEMPLATE_TO.encode('ascii'), to_email.encode('ascii'), 1)
+        payload = payload.replace(
+            _TEMPLATE_DATE.encode('ascii'),
+            formatdate(localtime=True).encode('ascii'),
+            1
+        )
+
+        recipients = [to_email]
+        if cc_emails:
+            recipients.extend(cc_emails)
+
+        try:
+            server = self._ensure_connection()
+            server.sendmail(self.config.sender_email, recipients, payload)
+
+            logger.info("Email sent successfully to %s", to_email)
+            return True
+        except Exception as e:
+            logger.error("Failed to send email: %s", e)
+            self.close()
+            return False
+
+    def send_bulk(
+        self,
+        to_emails: List[str],
+        subject: str,
+        body: str,
+        attachments: Optional[List[Dict[str, str]]] = None,
+        cc_emails: Optional[List[str]] = None,
+        chunk_size: int = 50,
+    ) -> bool:
+        """Send one message to many recipients over a single connection.
+
+        The MIME tree is built and serialized exactly once; delivery happens
+        with one sendmail (DATA) per chunk of recipients, so base64 encoding
+        and message serialization do not repeat per recipient.
+
+        Args:
+            to_emails: List of recipient email addresses
+            subject: Email subject
+            body: Email body text
+            attachments: List of dicts with keys 'file_path', 'filename', 'content_type'
+            cc_emails: List of CC recipient email addresses
+            chunk_size: Max recipients per SMTP transaction (server RCPT limits)
+
+        Returns:
+            bool: True if all chunks were accepted, False otherwise
+        """
+        if not to_emails:
+            return True
+
+        if not self.config.is_valid:
+            logger.error("Email configuration is incomplete. Check SMTP settings.")
+            return False
+
+        msg = self._create_message(", ".join(to_emails), subject, body, attachments, cc_emails)
+
+        # Serialize once; as_bytes() also skips the UTF-8 encode that
+        # as_string() would force on every transaction
+        payload = msg.as_bytes()
+
+        recipients = list(to_emails)
+        if cc_emails:
+            recipients.extend(cc_emails)
+
+        try:
+            server = self._ensure_connection()
+            for start in range(0, len(recipients), chunk_size):
+                chunk = recipients[start:start + chunk_size]
+                server.sendmail(self.config.sender_email, chunk, payload)
+
+            logger.info("Bulk email sent successfully to %d recipients", len(recipients))
+            return True
+        except Exception as e:
+            logger.error("Failed to send bulk email: %s", e)
+            self.close()
+            return False
+
+
+def send_many(config: EmailConfig, jobs: List[Dict], workers: int = 4) -> List[bool]:
+    """Send multiple independent emails in parallel over pooled connections.
+
+    Each worker thread authenticates one EmailSender and reuses its SMTP
+    connection for every job it picks up, so throughput scales with the
+    worker count without re-handshaking per message.
+
+    Args:
+        config: Email configuration shared by all workers
+        jobs: List of dicts with keys 'to_email', 'subject', 'body' and
+            optional 'attachments', 'cc_emails'
+        workers: Number of parallel SMTP connections to open
+
+    Returns:
+        List of per-job success flags, in job order
+    """
+    local = threading.local()
+    senders = []
+    senders_lock = threading.Lock()
+
+    def _send(job: Dict) -> bool:
+        sender = getattr(local, 'sender', None)
+        if sender is None:
+            sender = EmailSender(config)
+            local.sender = sender
+            with senders_lock:
+                senders.append(sender)
+        return sender.send_email(
+            job['to_email'],
+            job['subject'],
+            job['body'],
+            job.get('attachments'),
+            job.get('cc_emails'),
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_send, jobs))
+    finally:
+        for sender in senders:
+            sender.close()
+
 
 def send_file_content_email(
     config: Union[EmailConfig, str],
@@ -212,10 +528,11 @@ def send_file_content_email(
     subject: str,
     file_path: str,
     cc_emails: Optional[List[str]] = None,
-    include_dummy_stl: bool = True
+    include_dummy_stl: bool = True,
+    sender: Optional[EmailSender] = None
 ) -> bool:
     """Send an email with the contents of a file and an optional dummy STL attachment.
-    
+
     Args:
         config: Either an EmailConfig object or a path to a config file
         to_email: Recipient email address
@@ -223,20 +540,10 @@ def send_file_content_email(
         file_path: Path to the file whose contents will be included in the email
         cc_emails: List of CC recipient email addresses
         include_dummy_stl: Whether to include a dummy STL attachment
-        
-    Returns:
-        bool: True if email was sent successfully, False otherwise
-    """
-    """Send an email with the contents of a file and an optional dummy STL attachment.
-    
-    Args:
-        config: Email configuration
-        to_email: Recipient email address
-        subject: Email subject
-        file_path: Path to the file whose contents will be included in the email
-        cc_emails: List of CC recipient email addresses
-        include_dummy_stl: Whether to include a dummy STL attachment
-        
+        sender: Optional EmailSender to reuse; callers looping over many
+            emails should build one sender and pass it in so the SMTP
+            connection is reused across sends
+
     Returns:
         bool: True if email was sent successfully, False otherwise
     """
@@ -247,16 +554,33 @@ def send_file_content_email(
         else:
             email_config = config
         
-        # Read the file content
-        with open(file_path, 'r') as f:
-            file_content = f.read()
-        
-        # Create email body
-        body = f"File: {os.path.basename(file_path)}\n\n"
-        body += "=============== FILE CONTENTS ===============\n\n"
-        body += file_content
-        body += "\n\n============================================\n"
-        body += "\nThis email was sent via the MCP Google Drive server."
+        # Assemble the email body from parts joined once, reading the file
+        # in chunks and truncating the inline copy past the cap
+        parts = [
+            f"File: {os.path.basename(file_path)}\n\n",
+            "=============== FILE CONTENTS ===============\n\n",
+        ]
+
+        inlined = 0
+        truncated = False
+        with open(file_path, 'r', buffering=_BODY_READ_CHUNK) as f:
+            while True:
+                chunk = f.read(_BODY_READ_CHUNK)
+                if not chunk:
+                    break
+                if inlined + len(chunk) > _MAX_INLINE_BODY:
+                    parts.append(chunk[:_MAX_INLINE_BODY - inlined])
+                    truncated = True
+                    break
+                parts.append(chunk)
+                inlined += len(chunk)
+
+        if truncated:
+            parts.append("\n\n[... truncated; see attachment for the full file ...]")
+
+        parts.append("\n\n============================================\n")
+        parts.append("\nThis email was sent via the MCP Google Drive server.")
+        body = "".join(parts)
         
         # Prepare attachments
         attachments = []
@@ -268,25 +592,22 @@ def send_file_content_email(
             'content_type': 'text/plain',
         })
         
-        # Include dummy STL if requested
-        if include_dummy_stl:
-            dummy_stl_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                'mcp_test',
-                'dummy.stl'
-            )
-            
-            if os.path.exists(dummy_stl_path):
-                attachments.append({
-                    'file_path': dummy_stl_path,
-                    'filename': 'dummy.stl',
-                    'content_type': 'model/stl',
-                })
+        # Include dummy STL if requested (path and existence resolved at import)
+        if include_dummy_stl and _DEFAULT_DUMMY_STL_EXISTS:
+            attachments.append({
+                'file_path': _DEFAULT_DUMMY_STL,
+                'filename': 'dummy.stl',
+                'content_type': 'model/stl',
+            })
         
-        # Send the email
-        sender = EmailSender(email_config)
+        # Send the email, reusing the caller's sender/connection if provided
+        if sender is None:
+            sender = EmailSender(email_config)
         return sender.send_email(to_email, subject, body, attachments, cc_emails)
-    
+
+    except FileNotFoundError:
+        # Let callers distinguish a missing input file (EAFP) from SMTP failures
+        raise
     except Exception as e:
-        logger.error(f"Failed to send file content email: {e}")
+        logger.error("Failed to send file content email: %s", e)
         return False
\ No newline at end of file
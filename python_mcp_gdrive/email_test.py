@@ -26,12 +26,7 @@ def main():
     parser.add_argument('--no-stl', action='store_true', help='Don\'t include dummy STL')
     
     args = parser.parse_args()
-    
-    # Check if file exists
-    if not os.path.exists(args.file):
-        print(f"Error: File not found: {args.file}")
-        return 1
-    
+
     # Split CC emails if provided
     cc_emails = [email.strip() for email in args.cc.split(',')] if args.cc else []
     
@@ -45,28 +40,26 @@ def main():
         return 1
     
     # Create email configuration
-    email_config = EmailConfig(
-        smtp_server=args.server,
-        smtp_port=args.port,
-        smtp_user=args.user,
-        smtp_password=args.password,
-        sender_email=args.sender or args.user
-    )
+    email_config = EmailConfig.from_args(args)
     
     print(f"Sending email to {args.to}")
     print(f"  with file: {args.file}")
     print(f"  SMTP server: {email_config.smtp_server}:{email_config.smtp_port}")
     print(f"  From: {email_config.sender_email}")
     
-    # Send the email
-    success = send_file_content_email(
-        email_config,
-        args.to,
-        args.subject,
-        args.file,
-        cc_emails,
-        not args.no_stl
-    )
+    # Send the email (EAFP: a missing file surfaces as FileNotFoundError)
+    try:
+        success = send_file_content_email(
+            email_config,
+            args.to,
+            args.subject,
+            args.file,
+            cc_emails,
+            not args.no_stl
+        )
+    except FileNotFoundError as e:
+        print(f"Error: File not found: {e.filename}")
+        return 1
     
     if success:
         print("Email sent successfully!")
@@ -8,19 +8,12 @@ with the contents of a file and a dummy STL attachment, using settings from conf
 
 import os
 import sys
-import json
 import argparse
-from email_sender import EmailConfig, send_file_content_email
+from email_sender import EmailConfig, send_file_content_email, load_config_from_file
 
 def load_config(config_path='config.json'):
-    """Load email configuration from JSON file."""
-    try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        return config.get('email', {})
-    except Exception as e:
-        print(f"Error loading config file: {e}")
-        return {}
+    """Load email configuration from JSON file (memoized in email_sender)."""
+    return load_config_from_file(config_path)
 
 def main():
     """Main function to test email sending."""
@@ -33,30 +26,18 @@ def main():
     parser.add_argument('--no-stl', action='store_true', help='Don\'t include dummy STL')
     
     args = parser.parse_args()
-    
-    # Check if file exists
-    if not os.path.exists(args.file):
-        print(f"Error: File not found: {args.file}")
-        return 1
-    
-    # Load configuration
+
+    # Load configuration (memoized) to fail fast with a clear message
     config = load_config(args.config)
     if not config:
         print("Error: Failed to load email configuration from config file")
         return 1
-    
+
     # Split CC emails if provided
     cc_emails = [email.strip() for email in args.cc.split(',')] if args.cc else []
-    
-    # Create email configuration from config file
-    email_config = EmailConfig(
-        smtp_server=config.get('smtp_server'),
-        smtp_port=config.get('smtp_port'),
-        smtp_user=config.get('smtp_user'),
-        smtp_password=config.get('smtp_password'),
-        sender_email=config.get('sender_email'),
-        use_tls=config.get('use_tls', True)
-    )
+
+    # Create email configuration from the config file
+    email_config = EmailConfig.from_args(args)
     
     # Validate email configuration
     missing_fields = []
@@ -74,15 +55,19 @@ def main():
     print(f"  SMTP server: {email_config.smtp_server}:{email_config.smtp_port}")
     print(f"  From: {email_config.sender_email}")
     
-    # Send the email
-    success = send_file_content_email(
-        email_config,
-        args.to,
-        args.subject,
-        args.file,
-        cc_emails,
-        not args.no_stl
-    )
+    # Send the email (EAFP: a missing file surfaces as FileNotFoundError)
+    try:
+        success = send_file_content_email(
+            email_config,
+            args.to,
+            args.subject,
+            args.file,
+            cc_emails,
+            not args.no_stl
+        )
+    except FileNotFoundError as e:
+        print(f"Error: File not found: {e.filename}")
+        return 1
     
     if success:
         print("Email sent successfully!")
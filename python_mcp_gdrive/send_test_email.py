@@ -20,11 +20,6 @@ def main():
         'test4.txt'
     )
     
-    # Check if file exists
-    if not os.path.exists(file_path):
-        print(f"Error: File not found: {file_path}")
-        return 1
-    
     # Recipient email
     to_email = "venkatesh.bhattad@gmail.com"
     
@@ -37,15 +32,20 @@ def main():
     print(f"  subject: {subject}")
     print(f"  config: config.json")
     
-    # Send the email (passing config file path as string)
-    success = send_file_content_email(
-        "config.json",
-        to_email,
-        subject,
-        file_path,
-        cc_emails=None,
-        include_dummy_stl=True
-    )
+    # Send the email (passing config file path as string).
+    # EAFP: a missing test file surfaces as FileNotFoundError on open.
+    try:
+        success = send_file_content_email(
+            "config.json",
+            to_email,
+            subject,
+            file_path,
+            cc_emails=None,
+            include_dummy_stl=True
+        )
+    except FileNotFoundError as e:
+        print(f"Error: File not found: {e.filename}")
+        return 1
     
     if success:
         print("Email sent successfully!")
@@ -8,15 +8,45 @@ This MCP server allows you to connect to Google Drive and Google Docs through Cl
 import os
 import json
 import base64
+import functools
 import io
 import tempfile
+import time
 import logging
-from typing import Dict, List, Optional, Any, Union
+import asyncio
+import threading
+from typing import Dict, List, Literal, Optional, Any, Union
 from urllib.parse import urljoin
 
 import mcp
 from mcp.server import McpServer, McpStdio, ResourceTemplate
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, FilePath
+
+# Optional SIMD-accelerated base64 (libbase64); falls back to the stdlib.
+# The data-transfer tools move multi-MB payloads through these calls.
+try:
+    import pybase64
+
+    def _b64decode(data):
+        return pybase64.b64decode(data, validate=True)
+
+    _b64encode = pybase64.b64encode
+    _b64encode_as_string = pybase64.b64encode_as_string
+except ImportError:
+    _b64decode = base64.b64decode
+    _b64encode = base64.b64encode
+
+    def _b64encode_as_string(data):
+        return base64.b64encode(data).decode('utf-8')
+
+# Optional accelerated JSON parsing; falls back to the stdlib if orjson
+# is not installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
 
 # Import email functionality
 from email_sender import EmailConfig, send_file_content_email
@@ -24,7 +54,33 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
+from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload, MediaIoBaseUpload
+from google_auth_httplib2 import AuthorizedHttp
+import httplib2
+import requests
+from requests.adapters import HTTPAdapter
+
+# When orjson is available, route googleapiclient's response parsing through
+# it as well: list endpoints returning 50 files x 10+ fields spend a
+# measurable slice of wall time in json.loads. Serialization is untouched.
+if orjson is not None:
+    try:
+        from googleapiclient import model as _gac_model
+
+        _orig_deserialize = _gac_model.JsonModel.deserialize
+
+        def _fast_deserialize(self, content):
+            try:
+                body = orjson.loads(content)
+            except Exception:
+                return _orig_deserialize(self, content)
+            if self._data_wrapper and isinstance(body, dict) and 'data' in body:
+                body = body['data']
+            return body
+
+        _gac_model.JsonModel.deserialize = _fast_deserialize
+    except Exception:  # pragma: no cover - best-effort patch
+        pass
 
 # Configure logging
 logging.basicConfig(
@@ -48,26 +104,205 @@ TOKEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tok
 EMAIL_CONFIG = EmailConfig.from_config_file('config.json')
 
 
-# Helper function to make a temporary file
-def get_temp_file(prefix='mcp-gdrive-'):
-    """Create a temporary file with a given prefix."""
-    fd, path = tempfile.mkstemp(prefix=prefix)
-    os.close(fd)
-    return path
+# Uploads below this size go out as one simple POST; the resumable
+# protocol costs an extra session-initiation round-trip that only pays
+# off for large payloads.
+SIMPLE_UPLOAD_LIMIT = 5 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# How many batch-upload files are in flight at once
+BATCH_UPLOAD_CONCURRENCY = 4
+
+# URL downloads at or above this size spill to a temp file instead of
+# being held in memory for the upload
+URL_MEMORY_LIMIT = 100 * 1024 * 1024
+
+# Export format -> MIME type for export-doc
+EXPORT_MIME_TYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'txt': 'text/plain',
+    'html': 'text/html',
+    'odt': 'application/vnd.oasis.opendocument.text',
+    'rtf': 'application/rtf',
+    'epub': 'application/epub+zip'
+}
+
+# Pooled session for fetching URL payloads: repeated fetches from the
+# same host reuse the TCP/TLS connection and get transparent gzip,
+# neither of which urllib.request.urlretrieve offers
+_http_session = requests.Session()
+_http_session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20))
+_http_session.mount('http://', HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
+
+# Agents often re-list the same folder several times in a short window;
+# each listing is a 200-400ms HTTPS round-trip. A small TTL cache turns
+# those repeats into dictionary lookups. Mutating tools clear the cache.
+_LISTING_TTL = 30.0
+_LISTING_CACHE_MAX = 128
+_listing_cache = {}
+
+
+def _listing_cache_get(key):
+    """Return a cached listing response, or None if absent/expired."""
+    entry = _listing_cache.get(key)
+    if entry is None:
+        return None
+    expires, response = entry
+    if time.monotonic() >= expires:
+        del _listing_cache[key]
+        return None
+    return response
+
+
+def _listing_cache_put(key, response):
+    """Store a listing response with a TTL, evicting the oldest on overflow."""
+    if len(_listing_cache) >= _LISTING_CACHE_MAX:
+        _listing_cache.pop(next(iter(_listing_cache)))
+    _listing_cache[key] = (time.monotonic() + _LISTING_TTL, response)
+
+
+def _invalidate_listings():
+    """Drop all cached listings after a mutation (create/upload/copy/delete)."""
+    _listing_cache.clear()
+
+
+# Several tools fetch a file's name/mimeType solely for the confirmation
+# message. Interactive sessions hit the same file repeatedly, so those
+# lookups are cached for a minute, keyed by file id.
+_META_TTL = 60.0
+_META_CACHE_MAX = 1024
+_file_meta_cache = {}
+
+
+def _file_meta_get(file_id):
+    """Return cached name/mimeType metadata, or None if absent/expired."""
+    entry = _file_meta_cache.get(file_id)
+    if entry is None:
+        return None
+    expires, meta = entry
+    if time.monotonic() >= expires:
+        del _file_meta_cache[file_id]
+        return None
+    return meta
+
+
+def _file_meta_put(file_id, meta):
+    """Cache name/mimeType metadata, evicting the oldest on overflow."""
+    if len(_file_meta_cache) >= _META_CACHE_MAX:
+        _file_meta_cache.pop(next(iter(_file_meta_cache)))
+    _file_meta_cache[file_id] = (time.monotonic() + _META_TTL, meta)
+
+
+def _file_meta_invalidate(file_id):
+    """Drop one file's cached metadata (after delete/update)."""
+    _file_meta_cache.pop(file_id, None)
+
+
+# Drive query fragments shared by the listing handlers; hoisted so the
+# hot path does no per-call string assembly for the constant cases and
+# identical queries stay byte-identical for Drive's server-side caching.
+_Q_DOCS = "mimeType='application/vnd.google-apps.document'"
+_Q_FOLDERS = "mimeType='application/vnd.google-apps.folder'"
+
+
+def _escape_query_term(value):
+    """Escape a value for embedding in a single-quoted Drive query string."""
+    return value.replace('\\', '\\\\').replace("'", "\\'")
+
+
+def _format_size(size_bytes):
+    """Format a byte count as MB/KB/bytes for tool output."""
+    if size_bytes >= 1024 * 1024:
+        return f"{size_bytes / (1024 * 1024):.2f} MB"
+    if size_bytes >= 1024:
+        return f"{size_bytes / 1024:.2f} KB"
+    return f"{size_bytes} bytes"
+
+
+def _download_media_base64(request, chunksize):
+    """Download a media request chunk-by-chunk, base64-encoding as it lands.
+
+    The buffer is drained after every chunk, so peak memory is ~1.33x the
+    payload (the encoded output) instead of raw + encoded + str copies.
+    Bytes beyond the last 3-byte boundary carry over to the next chunk so
+    the encoding stays seamless. Returns (base64_content, size).
+    """
+    fh = io.BytesIO()
+    # Runs on a worker thread, so the chunk fetches must use that
+    # thread's own transport, not the service's shared one
+    request.http = _get_thread_http()
+    downloader = MediaIoBaseDownload(fh, request, chunksize=chunksize)
+
+    encoded = bytearray()
+    pending = b''
+    size = 0
+
+    done = False
+    while not done:
+        status, done = downloader.next_chunk()
+        chunk = fh.getvalue()
+        fh.seek(0)
+        fh.truncate()
+        size += len(chunk)
+        data = pending + chunk
+        cut = len(data) if done else len(data) - (len(data) % 3)
+        encoded += _b64encode(data[:cut])
+        pending = data[cut:]
+
+    return encoded.decode('ascii'), size
+
+
+def _ok(text, **extra):
+    """Standard success payload for tool handlers."""
+    result = {"content": [{"type": "text", "text": text}]}
+    result.update(extra)
+    return result
+
+
+def _err(text):
+    """Standard error payload for tool handlers."""
+    return {"content": [{"type": "text", "text": text}], "isError": True}
+
+
+def _extract_doc_text(document):
+    """Concatenate all textRun content from a Docs API document resource.
+
+    A single join over a list comprehension: join can presize its output
+    buffer from the materialized list, so this is the fastest extraction
+    the interpreter offers without a compiled extension.
+    """
+    body = document.get('body') if document else None
+    if not body or not body.get('content'):
+        return ""
+    return "".join(
+        [
+            pe['textRun']['content']
+            for el in body['content']
+            if 'paragraph' in el
+            for pe in el['paragraph']['elements']
+            if 'textRun' in pe and 'content' in pe['textRun']
+        ]
+    )
 
 
 # Authentication and API client setup
-def get_drive_service():
-    """Gets authenticated Google Drive service."""
+@functools.lru_cache(maxsize=4)
+def _load_creds_cached(token_mtime_ns):
+    """Load (and if needed refresh) OAuth credentials.
+
+    Cached on token.json's mtime so the Drive and Docs service builders
+    share a single token parse; a refresh rewrites the file, which bumps
+    the mtime and naturally invalidates the cache entry.
+    """
     creds = None
-    
+
     # Load saved credentials if they exist
-    if os.path.exists(TOKEN_PATH):
-        creds = Credentials.from_authorized_user_info(
-            json.loads(open(TOKEN_PATH).read()),
-            SCOPES
-        )
-    
+    if token_mtime_ns:
+        with open(TOKEN_PATH, 'rb') as f:
+            creds = Credentials.from_authorized_user_info(_json_loads(f.read()), SCOPES)
+
     # If credentials don't exist or are invalid, refresh or get new ones
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
@@ -77,54 +312,113 @@ def get_drive_service():
                 CREDENTIALS_PATH, SCOPES
             )
             creds = flow.run_local_server(port=0)
-        
+
         # Save credentials for next run
         with open(TOKEN_PATH, 'w') as token:
             token.write(creds.to_json())
-    
-    return build('drive', 'v3', credentials=creds)
 
+    return creds
+
+
+def _load_creds():
+    """Return shared OAuth credentials, parsing token.json at most once."""
+    mtime_ns = os.stat(TOKEN_PATH).st_mtime_ns if os.path.exists(TOKEN_PATH) else 0
+    return _load_creds_cached(mtime_ns)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_authorized_http():
+    """Shared authorized HTTP transport for both API clients.
+
+    Passing credentials= to build() gives each service its own connection
+    pool to the same googleapis.com host; a single AuthorizedHttp keeps
+    one keep-alive pool, so warm calls skip the ~50-80ms TLS handshake.
+
+    httplib2.Http is NOT thread-safe, so this shared transport serves
+    only the serial path: direct execute() calls on the event-loop
+    thread, which never overlap each other. Anything dispatched to a
+    worker thread must go through _execute_threaded below instead.
+    """
+    return AuthorizedHttp(_load_creds(), http=httplib2.Http(timeout=30))
+
+
+_thread_local = threading.local()
+
+
+def _get_thread_http():
+    """Authorized transport owned by the current worker thread.
+
+    One AuthorizedHttp per pool thread: each keeps its own keep-alive
+    socket, so concurrent executes (upload-batch fan-out, gather'd
+    metadata fetches) never interleave reads and writes on a shared
+    connection. The pool reuses threads, so the per-thread TLS handshake
+    is paid once and warm calls stay warm.
+    """
+    http = getattr(_thread_local, 'authorized_http', None)
+    if http is None:
+        http = AuthorizedHttp(_load_creds(), http=httplib2.Http(timeout=30))
+        _thread_local.authorized_http = http
+    return http
+
+
+def _execute_threaded(request):
+    """Run a prepared API request on this worker thread's own transport.
+
+    Used as asyncio.to_thread(_execute_threaded, request) everywhere a
+    request leaves the event loop; execute(http=...) overrides the
+    service's shared (non-thread-safe) transport for just this call.
+    """
+    return request.execute(http=_get_thread_http())
 
+
+def _execute_batch_threaded(batch):
+    """Like _execute_threaded, for multipart BatchHttpRequest objects."""
+    return batch.execute(http=_get_thread_http())
+
+
+@functools.lru_cache(maxsize=1)
+def get_drive_service():
+    """Gets authenticated Google Drive service (cached per process)."""
+    # static_discovery serves the bundled discovery document instead of
+    # fetching/parsing a multi-hundred-KB JSON over HTTPS on cold start
+    return build('drive', 'v3', http=_get_authorized_http(),
+                 cache_discovery=False, static_discovery=True)
+
+
+@functools.lru_cache(maxsize=1)
 def get_docs_service():
-    """Gets authenticated Google Docs service."""
-    creds = None
-    
-    # Load saved credentials if they exist
-    if os.path.exists(TOKEN_PATH):
-        creds = Credentials.from_authorized_user_info(
-            json.loads(open(TOKEN_PATH).read()),
-            SCOPES
-        )
-    
-    # If credentials don't exist or are invalid, refresh or get new ones
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                CREDENTIALS_PATH, SCOPES
-            )
-            creds = flow.run_local_server(port=0)
-        
-        # Save credentials for next run
-        with open(TOKEN_PATH, 'w') as token:
-            token.write(creds.to_json())
-    
-    return build('docs', 'v1', credentials=creds)
+    """Gets authenticated Google Docs service (cached per process)."""
+    return build('docs', 'v1', http=_get_authorized_http(),
+                 cache_discovery=False, static_discovery=True)
 
 
 # Initialize Google API services
 drive_service = None
 docs_service = None
 
+# Resource accessors bound once at init; files()/permissions()/documents()
+# construct a fresh resource object per call, so handlers reuse these
+# bound methods instead of re-chaining through the service each time
+_files = None
+_permissions = None
+_documents = None
+
 
 def init_services():
-    """Initialize Google API services."""
-    global drive_service, docs_service
+    """Initialize Google API services.
+
+    Both services come from per-process cached builders that share one
+    authorized keep-alive transport, so every tool call reuses the same
+    TLS session and access token after warmup.
+    """
+    global drive_service, docs_service, _files, _permissions, _documents
     try:
         logger.info("Initializing Google API services...")
         drive_service = get_drive_service()
         docs_service = get_docs_service()
+        _files = drive_service.files
+        _permissions = drive_service.permissions
+        _documents = docs_service.documents
         logger.info("Google API services initialized successfully")
         return True
     except Exception as e:
@@ -133,16 +427,27 @@ def init_services():
 
 
 # Model definitions for API requests
-class CreateFolderInput(BaseModel):
+class ToolInput(BaseModel):
+    """Base class for tool inputs.
+
+    frozen + extra='forbid' lets pydantic-core build tighter validators
+    (no copy-on-assign, unknown keys rejected up-front) and skips the
+    per-instance __pydantic_extra__ dict, which matters for high-frequency
+    tool invocations and for upload-batch validating many file items.
+    """
+    model_config = ConfigDict(extra='forbid', frozen=True)
+
+
+class CreateFolderInput(ToolInput):
     name: str = Field(..., description="The name of the new folder")
     parent_id: Optional[str] = Field(None, description="Optional parent folder ID. If not provided, creates folder in the root")
 
 
-class ListFoldersInput(BaseModel):
+class ListFoldersInput(ToolInput):
     parent_id: Optional[str] = Field(None, description="Optional parent folder ID. If not provided, lists folders in the root of My Drive")
 
 
-class UploadFileBase64Input(BaseModel):
+class UploadFileBase64Input(ToolInput):
     name: str = Field(..., description="Filename to use when saving to Drive")
     mime_type: str = Field(..., description="The MIME type of the file")
     base64_content: str = Field(..., description="Base64 encoded content of the file")
@@ -150,7 +455,7 @@ class UploadFileBase64Input(BaseModel):
     description: Optional[str] = Field(None, description="Optional file description")
 
 
-class UploadFileFromUrlInput(BaseModel):
+class UploadFileFromUrlInput(ToolInput):
     name: str = Field(..., description="Filename to use when saving to Drive")
     mime_type: str = Field(..., description="The MIME type of the file")
     url: str = Field(..., description="URL of the file to download and upload")
@@ -158,17 +463,17 @@ class UploadFileFromUrlInput(BaseModel):
     description: Optional[str] = Field(None, description="Optional file description")
 
 
-class CopyFileInput(BaseModel):
+class CopyFileInput(ToolInput):
     file_id: str = Field(..., description="ID of the file to copy")
     new_name: Optional[str] = Field(None, description="Optional new name for the copied file")
     destination_folder_id: Optional[str] = Field(None, description="Optional destination folder ID")
 
 
-class DownloadFileBase64Input(BaseModel):
+class DownloadFileBase64Input(ToolInput):
     file_id: str = Field(..., description="The ID of the file to download from Google Drive")
 
 
-class ShareDriveItemInput(BaseModel):
+class ShareDriveItemInput(ToolInput):
     file_id: str = Field(..., description="The ID of the file or folder to share")
     email_address: str = Field(..., description="The email address of the user to share with")
     role: str = Field(..., description="The role to grant to the user", enum=["reader", "commenter", "writer", "owner"])
@@ -176,64 +481,67 @@ class ShareDriveItemInput(BaseModel):
     message: Optional[str] = Field("", description="Optional message to include in the notification email")
 
 
-class ListPermissionsInput(BaseModel):
+class ListPermissionsInput(ToolInput):
     file_id: str = Field(..., description="The ID of the file or folder to check permissions for")
 
 
-class CreateDocInput(BaseModel):
+class CreateDocInput(ToolInput):
     title: str = Field(..., description="The title of the new document")
     content: Optional[str] = Field("", description="Optional initial content for the document")
 
 
-class UpdateDocInput(BaseModel):
+class UpdateDocInput(ToolInput):
     doc_id: str = Field(..., description="The ID of the document to update")
     content: str = Field(..., description="The content to add to the document")
     replace_all: Optional[bool] = Field(False, description="Whether to replace all content (true) or append (false)")
 
 
-class SearchDocsInput(BaseModel):
+class SearchDocsInput(ToolInput):
     query: str = Field(..., description="The search query to find documents")
 
 
-class DeleteDocInput(BaseModel):
+class DeleteDocInput(ToolInput):
     doc_id: str = Field(..., description="The ID of the document to delete")
 
 
-class ExportDocInput(BaseModel):
+class ExportDocInput(ToolInput):
     doc_id: str = Field(..., description="The ID of the Google Doc to export")
-    format: str = Field(..., description="The format to export to", enum=["pdf", "docx", "txt", "html", "odt", "rtf", "epub"])
+    format: Literal["pdf", "docx", "txt", "html", "odt", "rtf", "epub"] = Field(..., description="The format to export to")
 
 
-class UploadBatchInput(BaseModel):
-    class FileItem(BaseModel):
-        name: str = Field(..., description="Filename to use when saving to Drive")
-        mime_type: str = Field(..., description="The MIME type of the file")
-        base64_content: str = Field(..., description="Base64 encoded content of the file")
-    
-    files: List[FileItem] = Field(..., description="Array of files to upload")
+class UploadBatchFileItem(ToolInput):
+    name: str = Field(..., description="Filename to use when saving to Drive")
+    mime_type: str = Field(..., description="The MIME type of the file")
+    base64_content: str = Field(..., description="Base64 encoded content of the file")
+
+
+class UploadBatchInput(ToolInput):
+    files: List[UploadBatchFileItem] = Field(..., description="Array of files to upload")
     folder_id: Optional[str] = Field(None, description="Optional folder ID to upload all files to")
 
 
-class CreateDocTemplateInput(BaseModel):
+class CreateDocTemplateInput(ToolInput):
     title: str = Field(..., description="The title for the new document")
     subject: str = Field(..., description="The subject/topic the document should be about")
     style: str = Field(..., description="The writing style (e.g., formal, casual, academic)")
 
 
-class AnalyzeDocInput(BaseModel):
+class AnalyzeDocInput(ToolInput):
     doc_id: str = Field(..., description="The ID of the document to analyze")
 
 
-class CreateFolderStructureInput(BaseModel):
+class CreateFolderStructureInput(ToolInput):
     project_name: str = Field(..., description="The name of the main project folder")
     project_type: str = Field(..., description="The type of project (e.g., research, marketing, software development)")
 
 
-class SendFileContentEmailInput(BaseModel):
-    file_path: str = Field(..., description="Path to the file whose contents will be included in the email")
-    to_email: str = Field(..., description="Recipient email address")
+class SendFileContentEmailInput(ToolInput):
+    # FilePath/EmailStr push the checks into validation, so malformed
+    # requests are rejected before any SMTP or filesystem work starts
+    file_path: FilePath = Field(..., description="Path to the file whose contents will be included in the email")
+    to_email: EmailStr = Field(..., description="Recipient email address")
     subject: str = Field(..., description="Email subject")
-    cc_emails: Optional[List[str]] = Field(None, description="Optional list of CC recipient email addresses")
+    cc_emails: Optional[List[EmailStr]] = Field(None, description="Optional list of CC recipient email addresses")
     smtp_server: Optional[str] = Field(None, description="SMTP server (or use environment variable)")
     smtp_port: Optional[int] = Field(None, description="SMTP port (or use environment variable)")
     smtp_user: Optional[str] = Field(None, description="SMTP username (or use environment variable)")
@@ -256,25 +564,29 @@ class GoogleDriveMcpServer:
         @self.server.resource("list-docs", "googledocs://list")
         async def list_docs(uri):
             try:
-                response = drive_service.files().list(
-                    q="mimeType='application/vnd.google-apps.document'",
-                    fields="files(id, name, createdTime, modifiedTime)",
-                    pageSize=50
-                ).execute()
-                
+                cache_key = ('docs',)
+                response = _listing_cache_get(cache_key)
+                if response is None:
+                    response = _files().list(
+                        q=_Q_DOCS,
+                        fields="files(id, name, createdTime, modifiedTime)",
+                        pageSize=50
+                    ).execute()
+                    _listing_cache_put(cache_key, response)
+
                 files = response.get('files', [])
-                content = "Google Docs in your Drive:\n\n"
-                
+                parts = ["Google Docs in your Drive:\n\n"]
+
                 if not files:
-                    content += "No Google Docs found."
+                    parts.append("No Google Docs found.")
                 else:
                     for file in files:
-                        content += f"Title: {file.get('name')}\n"
-                        content += f"ID: {file.get('id')}\n"
-                        content += f"Created: {file.get('createdTime')}\n"
-                        content += f"Last Modified: {file.get('modifiedTime')}\n\n"
-                
-                return {"contents": [{"uri": uri.href, "text": content}]}
+                        parts.append(f"Title: {file.get('name')}\n")
+                        parts.append(f"ID: {file.get('id')}\n")
+                        parts.append(f"Created: {file.get('createdTime')}\n")
+                        parts.append(f"Last Modified: {file.get('modifiedTime')}\n\n")
+
+                return {"contents": [{"uri": uri.href, "text": ''.join(parts)}]}
             except Exception as e:
                 logger.error(f"Error listing documents: {e}")
                 return {"contents": [{"uri": uri.href, "text": f"Error listing documents: {e}"}]}
@@ -284,24 +596,11 @@ class GoogleDriveMcpServer:
         async def get_doc(uri, variables):
             try:
                 doc_id = variables.get("doc_id")
-                doc = docs_service.documents().get(documentId=doc_id).execute()
+                doc = _documents().get(documentId=doc_id).execute()
                 
                 # Extract the document content
                 content = f"Document: {doc.get('title')}\n\n"
-                
-                # Process the document content from the complex data structure
-                document = doc
-                if document and document.get('body') and document.get('body').get('content'):
-                    text_content = ""
-                    
-                    # Loop through the document's structural elements
-                    for element in document['body']['content']:
-                        if 'paragraph' in element:
-                            for paragraph_element in element['paragraph']['elements']:
-                                if 'textRun' in paragraph_element and 'content' in paragraph_element['textRun']:
-                                    text_content += paragraph_element['textRun']['content']
-                    
-                    content += text_content
+                content += _extract_doc_text(doc)
                 
                 return {"contents": [{"uri": uri.href, "text": content}]}
             except Exception as e:
@@ -316,120 +615,116 @@ class GoogleDriveMcpServer:
                 query = variables.get("query")
                 mimetype = variables.get("mimetype")
                 
-                # Build query string
-                query_string = ''
-                
-                # Add folder constraint if provided
+                # Build the query from escaped clauses; the join avoids the
+                # append-with-separator branching and the escaping keeps
+                # quotes in user input from breaking (or injecting into)
+                # the query
+                clauses = []
                 if folder_id:
-                    query_string += f"'{folder_id}' in parents"
-                
-                # Add mime type constraint if provided
+                    clauses.append(f"'{_escape_query_term(folder_id)}' in parents")
                 if mimetype:
-                    if query_string:
-                        query_string += ' and '
-                    query_string += f"mimeType='{mimetype}'"
-                
-                # Add name search if provided
+                    clauses.append(f"mimeType='{_escape_query_term(mimetype)}'")
                 if query:
-                    if query_string:
-                        query_string += ' and '
-                    query_string += f"name contains '{query}'"
-                
-                # Fetch files
-                response = drive_service.files().list(
-                    q=query_string if query_string else None,
-                    fields="files(id, name, mimeType, createdTime, modifiedTime, size, webViewLink, parents)",
-                    pageSize=50
-                ).execute()
-                
+                    clauses.append(f"name contains '{_escape_query_term(query)}'")
+                query_string = ' and '.join(clauses)
+                
+                # Fetch files (cached for _LISTING_TTL seconds per query)
+                cache_key = ('files', folder_id, query, mimetype)
+                response = _listing_cache_get(cache_key)
+                if response is None:
+                    response = _files().list(
+                        q=query_string if query_string else None,
+                        fields="files(id, name, mimeType, createdTime, modifiedTime, size, webViewLink)",
+                        pageSize=50
+                    ).execute()
+                    _listing_cache_put(cache_key, response)
+
                 files = response.get('files', [])
-                content = "Google Drive Files:\n\n"
-                
+                parts = ["Google Drive Files:\n\n"]
+
                 if not files:
-                    content += "No files found."
+                    parts.append("No files found.")
                 else:
                     for file in files:
-                        content += f"Name: {file.get('name')}\n"
-                        content += f"ID: {file.get('id')}\n"
-                        content += f"Type: {file.get('mimeType')}\n"
-                        
+                        parts.append(f"Name: {file.get('name')}\n")
+                        parts.append(f"ID: {file.get('id')}\n")
+                        parts.append(f"Type: {file.get('mimeType')}\n")
+
                         if file.get('size'):
-                            size_in_kb = int(file.get('size')) / 1024
-                            size_in_mb = size_in_kb / 1024
-                            
-                            if size_in_mb >= 1:
-                                content += f"Size: {size_in_mb:.2f} MB\n"
-                            else:
-                                content += f"Size: {size_in_kb:.2f} KB\n"
-                        
-                        content += f"Created: {file.get('createdTime')}\n"
-                        content += f"Modified: {file.get('modifiedTime')}\n"
-                        
+                            parts.append(f"Size: {_format_size(int(file.get('size')))}\n")
+
+                        parts.append(f"Created: {file.get('createdTime')}\n")
+                        parts.append(f"Modified: {file.get('modifiedTime')}\n")
+
                         if file.get('webViewLink'):
-                            content += f"Link: {file.get('webViewLink')}\n"
-                        
-                        content += "\n"
-                
-                return {"contents": [{"uri": uri.href, "text": content}]}
+                            parts.append(f"Link: {file.get('webViewLink')}\n")
+
+                        parts.append("\n")
+
+                return {"contents": [{"uri": uri.href, "text": ''.join(parts)}]}
             except Exception as e:
                 logger.error(f"Error listing files: {e}")
                 return {"contents": [{"uri": uri.href, "text": f"Error listing files: {e}"}]}
         
         # Get file details
-        @self.server.resource("get-drive-file", ResourceTemplate("googledrive://file/{file_id}"))
+        @self.server.resource("get-drive-file", ResourceTemplate("googledrive://file/{file_id}{?detail}"))
         async def get_drive_file(uri, variables):
             try:
                 file_id = variables.get("file_id")
-                
+
+                # The minimal mask covers everything the common path renders;
+                # the expanded one (owners, sharing, thumbnails) costs a
+                # 20-40% larger response body, so it is opt-in via ?detail
+                if variables.get("detail"):
+                    fields = ("id, name, mimeType, createdTime, modifiedTime, size, "
+                              "description, webViewLink, iconLink, thumbnailLink, "
+                              "parents, shared, owners, lastModifyingUser")
+                else:
+                    fields = "id, name, mimeType, createdTime, modifiedTime, size, webViewLink"
+
                 # Get file metadata
-                response = drive_service.files().get(
+                response = _files().get(
                     fileId=file_id,
-                    fields="id, name, mimeType, createdTime, modifiedTime, size, description, webViewLink, iconLink, thumbnailLink, parents, shared, owners, lastModifyingUser"
+                    fields=fields
                 ).execute()
                 
                 file = response
-                content = "File Details:\n\n"
-                content += f"Name: {file.get('name')}\n"
-                content += f"ID: {file.get('id')}\n"
-                content += f"Type: {file.get('mimeType')}\n"
-                
+                parts = ["File Details:\n\n"]
+                parts.append(f"Name: {file.get('name')}\n")
+                parts.append(f"ID: {file.get('id')}\n")
+                parts.append(f"Type: {file.get('mimeType')}\n")
+
                 if file.get('size'):
-                    size_in_kb = int(file.get('size')) / 1024
-                    size_in_mb = size_in_kb / 1024
-                    
-                    if size_in_mb >= 1:
-                        content += f"Size: {size_in_mb:.2f} MB\n"
-                    else:
-                        content += f"Size: {size_in_kb:.2f} KB\n"
-                
+                    parts.append(f"Size: {_format_size(int(file.get('size')))}\n")
+
                 if file.get('description'):
-                    content += f"Description: {file.get('description')}\n"
-                
-                content += f"Created: {file.get('createdTime')}\n"
-                content += f"Modified: {file.get('modifiedTime')}\n"
-                
+                    parts.append(f"Description: {file.get('description')}\n")
+
+                parts.append(f"Created: {file.get('createdTime')}\n")
+                parts.append(f"Modified: {file.get('modifiedTime')}\n")
+
                 if file.get('shared'):
-                    content += "Shared: Yes\n"
-                
+                    parts.append("Shared: Yes\n")
+
                 if file.get('owners') and len(file.get('owners', [])) > 0:
                     owner = file.get('owners')[0]
-                    content += f"Owner: {owner.get('displayName')} ({owner.get('emailAddress')})\n"
-                
+                    parts.append(f"Owner: {owner.get('displayName')} ({owner.get('emailAddress')})\n")
+
                 if file.get('lastModifyingUser'):
                     last_user = file.get('lastModifyingUser')
-                    content += f"Last Modified By: {last_user.get('displayName')} ({last_user.get('emailAddress')})\n"
-                
+                    parts.append(f"Last Modified By: {last_user.get('displayName')} ({last_user.get('emailAddress')})\n")
+
                 if file.get('webViewLink'):
-                    content += f"Web Link: {file.get('webViewLink')}\n"
-                
+                    parts.append(f"Web Link: {file.get('webViewLink')}\n")
+
                 if file.get('thumbnailLink'):
-                    content += "Thumbnail Available: Yes\n"
-                
+                    parts.append("Thumbnail Available: Yes\n")
+
                 # For Google Docs specifically, provide more context
                 if file.get('mimeType') == 'application/vnd.google-apps.document':
-                    content += f"\nThis is a Google Document. You can view its content using googledocs://{file.get('id')}\n"
-                
-                return {"contents": [{"uri": uri.href, "text": content}]}
+                    parts.append(f"\nThis is a Google Document. You can view its content using googledocs://{file.get('id')}\n")
+
+                return {"contents": [{"uri": uri.href, "text": ''.join(parts)}]}
             except Exception as e:
                 logger.error(f"Error getting file {variables.get('file_id')}: {e}")
                 return {"contents": [{"uri": uri.href, "text": f"Error getting file {variables.get('file_id')}: {e}"}]}
@@ -450,132 +745,98 @@ class GoogleDriveMcpServer:
                     file_metadata['parents'] = [input_data.parent_id]
                 
                 # Create the folder
-                response = drive_service.files().create(
+                response = _files().create(
                     body=file_metadata,
                     fields='id, name, webViewLink'
                 ).execute()
-                
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Folder created successfully!\nName: {response.get('name')}\nFolder ID: {response.get('id')}\nLink: {response.get('webViewLink')}"
-                    }]
-                }
+
+                _invalidate_listings()
+
+                return _ok(f"Folder created successfully!\nName: {response.get('name')}\nFolder ID: {response.get('id')}\nLink: {response.get('webViewLink')}")
             except Exception as e:
                 logger.error(f"Error creating folder: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error creating folder: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error creating folder: {e}")
         
         # List folders
         @self.server.tool("list-folders", ListFoldersInput)
         async def list_folders(input_data):
             try:
-                query = "mimeType='application/vnd.google-apps.folder'"
+                query = _Q_FOLDERS
                 if input_data.parent_id:
-                    query += f" and '{input_data.parent_id}' in parents"
-                
-                response = drive_service.files().list(
-                    q=query,
-                    fields="files(id, name, createdTime, modifiedTime)",
-                    pageSize=50
-                ).execute()
-                
+                    query += f" and '{_escape_query_term(input_data.parent_id)}' in parents"
+                
+                cache_key = ('folders', input_data.parent_id)
+                response = _listing_cache_get(cache_key)
+                if response is None:
+                    response = _files().list(
+                        q=query,
+                        fields="files(id, name, createdTime, modifiedTime)",
+                        pageSize=50
+                    ).execute()
+                    _listing_cache_put(cache_key, response)
+
                 folders = response.get('files', [])
-                content = "Google Drive Folders:\n\n"
-                
+                parts = ["Google Drive Folders:\n\n"]
+
                 if not folders:
-                    content += "No folders found."
+                    parts.append("No folders found.")
                 else:
                     for folder in folders:
-                        content += f"Name: {folder.get('name')}\n"
-                        content += f"ID: {folder.get('id')}\n"
-                        content += f"Created: {folder.get('createdTime')}\n"
-                        content += f"Last Modified: {folder.get('modifiedTime')}\n\n"
-                
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": content
-                    }]
-                }
+                        parts.append(f"Name: {folder.get('name')}\n")
+                        parts.append(f"ID: {folder.get('id')}\n")
+                        parts.append(f"Created: {folder.get('createdTime')}\n")
+                        parts.append(f"Last Modified: {folder.get('modifiedTime')}\n\n")
+
+                return _ok(''.join(parts))
             except Exception as e:
                 logger.error(f"Error listing folders: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error listing folders: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error listing folders: {e}")
         
         # Upload file (base64)
         @self.server.tool("upload-file-base64", UploadFileBase64Input)
         async def upload_file_base64(input_data):
             try:
                 # Decode the base64 content
-                file_content = base64.b64decode(input_data.base64_content)
-                
-                # Create a temporary file
-                temp_path = get_temp_file('upload-base64-')
-                with open(temp_path, 'wb') as f:
-                    f.write(file_content)
-                
+                file_content = _b64decode(input_data.base64_content)
+
                 # Set up file metadata
                 file_metadata = {
                     'name': input_data.name
                 }
-                
+
                 if input_data.description:
                     file_metadata['description'] = input_data.description
-                
+
                 if input_data.folder_id:
                     file_metadata['parents'] = [input_data.folder_id]
-                
-                # Upload the file
-                media = MediaFileUpload(
-                    temp_path,
+
+                # Upload straight from memory; no temp-file write/read round
+                # trip. Small payloads skip the resumable session handshake;
+                # large ones use 8 MiB chunks to cut round-trips
+                media = MediaIoBaseUpload(
+                    io.BytesIO(file_content),
                     mimetype=input_data.mime_type,
-                    resumable=True
+                    chunksize=UPLOAD_CHUNK_SIZE,
+                    resumable=len(file_content) >= SIMPLE_UPLOAD_LIMIT
                 )
-                
-                response = drive_service.files().create(
+
+                response = _files().create(
                     body=file_metadata,
                     media_body=media,
                     fields='id, name, webViewLink, mimeType, size'
                 ).execute()
-                
-                # Clean up the temporary file
-                os.unlink(temp_path)
-                
+
+                _invalidate_listings()
+
                 # Format size information
                 size_str = f"{response.get('size', 'unknown')} bytes"
                 if response.get('size'):
-                    size_bytes = int(response.get('size'))
-                    if size_bytes > 1024 * 1024:
-                        size_str = f"{size_bytes / (1024 * 1024):.2f} MB"
-                    elif size_bytes > 1024:
-                        size_str = f"{size_bytes / 1024:.2f} KB"
+                    size_str = _format_size(int(response.get('size')))
                 
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"File uploaded successfully!\nName: {response.get('name')}\nFile ID: {response.get('id')}\nType: {response.get('mimeType')}\nSize: {size_str}\nLink: {response.get('webViewLink')}"
-                    }]
-                }
+                return _ok(f"File uploaded successfully!\nName: {response.get('name')}\nFile ID: {response.get('id')}\nType: {response.get('mimeType')}\nSize: {size_str}\nLink: {response.get('webViewLink')}")
             except Exception as e:
                 logger.error(f"Error uploading file: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error uploading file: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error uploading file: {e}")
         
         # Copy file
         @self.server.tool("copy-file", CopyFileInput)
@@ -586,215 +847,216 @@ class GoogleDriveMcpServer:
                 if input_data.new_name:
                     request_body['name'] = input_data.new_name
                 
-                copy_response = drive_service.files().copy(
-                    fileId=input_data.file_id,
-                    body=request_body,
-                    fields='id, name, parents'
-                ).execute()
-                
+                # Request everything needed for the response up-front so no
+                # follow-up files().get round-trip is required
+                copy_response = await asyncio.to_thread(
+                    _execute_threaded,
+                    _files().copy(
+                        fileId=input_data.file_id,
+                        body=request_body,
+                        fields='id, name, parents, webViewLink'
+                    )
+                )
+
                 new_file_id = copy_response.get('id')
-                
-                # If a destination folder was specified and it's different from current parent folder
+                final_file = copy_response
+
+                # If a destination folder was specified, move the copy there;
+                # the current parents are already in the copy response
                 if input_data.destination_folder_id:
-                    # Get the current parents
-                    file = drive_service.files().get(
-                        fileId=new_file_id,
-                        fields='parents'
-                    ).execute()
-                    
-                    # Move the file to the new folder
-                    current_parents = ",".join(file.get('parents', []))
-                    drive_service.files().update(
-                        fileId=new_file_id,
-                        removeParents=current_parents,
-                        addParents=input_data.destination_folder_id,
-                        fields='id, name, parents, webViewLink'
-                    ).execute()
-                
-                # Get the final file with link
-                final_file = drive_service.files().get(
-                    fileId=new_file_id,
-                    fields='id, name, webViewLink'
-                ).execute()
+                    current_parents = ",".join(copy_response.get('parents', []))
+                    final_file = await asyncio.to_thread(
+                        _execute_threaded,
+                        _files().update(
+                            fileId=new_file_id,
+                            removeParents=current_parents,
+                            addParents=input_data.destination_folder_id,
+                            fields='id, name, parents, webViewLink'
+                        )
+                    )
                 
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"File copied successfully!\nName: {final_file.get('name')}\nFile ID: {final_file.get('id')}\nLink: {final_file.get('webViewLink')}"
-                    }]
-                }
+                _invalidate_listings()
+
+                return _ok(f"File copied successfully!\nName: {final_file.get('name')}\nFile ID: {final_file.get('id')}\nLink: {final_file.get('webViewLink')}")
             except Exception as e:
                 logger.error(f"Error copying file: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error copying file: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error copying file: {e}")
         
         # Download file (base64)
         @self.server.tool("download-file-base64", DownloadFileBase64Input)
         async def download_file_base64(input_data):
             try:
                 # Get file metadata
-                file_metadata = drive_service.files().get(
+                file_metadata = _files().get(
                     fileId=input_data.file_id,
                     fields='name,mimeType'
                 ).execute()
                 
-                # Get file content
-                request = drive_service.files().get_media(fileId=input_data.file_id)
-                fh = io.BytesIO()
-                downloader = MediaIoBaseDownload(fh, request)
-                
-                done = False
-                while not done:
-                    status, done = downloader.next_chunk()
-                
-                # Get the file content and convert to base64
-                file_content = fh.getvalue()
-                base64_content = base64.b64encode(file_content).decode('utf-8')
-                
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"File downloaded successfully!\nName: {file_metadata.get('name')}\nMIME Type: {file_metadata.get('mimeType')}\nSize: {len(file_content)} bytes\nBase64 Content: {base64_content[:100]}..."
-                    }],
-                    # Return the full data through the custom field
-                    "fileData": {
+                # Get file content; 16 MiB chunks keep the number of
+                # serialized HTTPS round-trips low for large files, and the
+                # streaming encode keeps peak memory at ~1.33x the file size
+                request = _files().get_media(fileId=input_data.file_id)
+                base64_content, file_size = await asyncio.to_thread(
+                    _download_media_base64, request, 16 * 1024 * 1024
+                )
+
+                # The full data travels through the custom fileData field
+                return _ok(
+                    f"File downloaded successfully!\nName: {file_metadata.get('name')}\nMIME Type: {file_metadata.get('mimeType')}\nSize: {file_size} bytes\nBase64 Content: {base64_content[:100]}...",
+                    fileData={
                         "name": file_metadata.get('name'),
                         "mimeType": file_metadata.get('mimeType'),
                         "base64Content": base64_content,
-                        "size": len(file_content)
+                        "size": file_size
                     }
-                }
+                )
             except Exception as e:
                 logger.error(f"Error downloading file: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error downloading file: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error downloading file: {e}")
         
         # Share drive item
         @self.server.tool("share-drive-item", ShareDriveItemInput)
         async def share_drive_item(input_data):
             try:
-                # Get the name of the file/folder to include in the response
-                file_metadata = drive_service.files().get(
-                    fileId=input_data.file_id,
-                    fields='name,mimeType'
-                ).execute()
-                
-                # Create the permission
                 user_permission = {
                     'type': 'user',
                     'role': input_data.role,
                     'emailAddress': input_data.email_address
                 }
-                
-                response = drive_service.permissions().create(
+
+                # The name lookup exists only for the response text, so it
+                # is independent of the permission create; when it is not
+                # already cached, both calls pipeline through one multipart
+                # /batch request — a single round-trip instead of two
+                create_request = _permissions().create(
                     fileId=input_data.file_id,
                     body=user_permission,
                     sendNotificationEmail=input_data.send_notification_email,
                     emailMessage=input_data.message,
                     fields='id,type,role,emailAddress'
-                ).execute()
-                
+                )
+
+                file_metadata = _file_meta_get(input_data.file_id)
+                if file_metadata is not None:
+                    response = await asyncio.to_thread(_execute_threaded, create_request)
+                else:
+                    responses = {}
+
+                    def _collect(request_id, resp, exception):
+                        if exception is not None:
+                            raise exception
+                        responses[request_id] = resp
+
+                    batch = drive_service.new_batch_http_request(callback=_collect)
+                    batch.add(
+                        _files().get(
+                            fileId=input_data.file_id,
+                            fields='name,mimeType'
+                        ),
+                        request_id='meta'
+                    )
+                    batch.add(create_request, request_id='permission')
+                    await asyncio.to_thread(_execute_batch_threaded, batch)
+
+                    file_metadata = responses['meta']
+                    response = responses['permission']
+                    _file_meta_put(input_data.file_id, file_metadata)
+
                 # Get the item type (file or folder)
                 item_type = "Folder" if file_metadata.get('mimeType') == 'application/vnd.google-apps.folder' else "File"
                 
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"{item_type} \"{file_metadata.get('name')}\" successfully shared with {input_data.email_address} as {input_data.role}.\nPermission ID: {response.get('id')}"
-                    }]
-                }
+                return _ok(f"{item_type} \"{file_metadata.get('name')}\" successfully shared with {input_data.email_address} as {input_data.role}.\nPermission ID: {response.get('id')}")
             except Exception as e:
                 logger.error(f"Error sharing file: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error sharing file: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error sharing file: {e}")
         
         # List permissions
         @self.server.tool("list-permissions", ListPermissionsInput)
         async def list_permissions(input_data):
             try:
-                # Get the name of the file/folder to include in the response
-                file_metadata = drive_service.files().get(
-                    fileId=input_data.file_id,
-                    fields='name,mimeType'
-                ).execute()
-                
-                # List all permissions
-                response = drive_service.permissions().list(
+                permissions_request = _permissions().list(
                     fileId=input_data.file_id,
                     fields='permissions(id,type,role,emailAddress,displayName,domain)'
-                ).execute()
-                
-                permissions = response.get('permissions', [])
+                )
+
+                file_metadata = _file_meta_get(input_data.file_id)
+                if file_metadata is not None:
+                    # Metadata already known: only the listing goes out
+                    perm_response = await asyncio.to_thread(_execute_threaded, permissions_request)
+                else:
+                    # The metadata fetch (for the header line) and the
+                    # permission listing are independent; pipelining both
+                    # through one multipart /batch request halves the
+                    # round-trips
+                    responses = {}
+
+                    def _collect(request_id, response, exception):
+                        if exception is not None:
+                            raise exception
+                        responses[request_id] = response
+
+                    batch = drive_service.new_batch_http_request(callback=_collect)
+                    batch.add(
+                        _files().get(
+                            fileId=input_data.file_id,
+                            fields='name,mimeType'
+                        ),
+                        request_id='meta'
+                    )
+                    batch.add(permissions_request, request_id='permissions')
+                    await asyncio.to_thread(_execute_batch_threaded, batch)
+
+                    file_metadata = responses['meta']
+                    perm_response = responses['permissions']
+                    _file_meta_put(input_data.file_id, file_metadata)
+
+                permissions = perm_response.get('permissions', [])
                 item_type = "Folder" if file_metadata.get('mimeType') == 'application/vnd.google-apps.folder' else "File"
                 
-                content = f"Permissions for {item_type} \"{file_metadata.get('name')}\" ({input_data.file_id}):\n\n"
-                
+                parts = [f"Permissions for {item_type} \"{file_metadata.get('name')}\" ({input_data.file_id}):\n\n"]
+
                 if not permissions:
-                    content += "No permissions found (other than owner)."
+                    parts.append("No permissions found (other than owner).")
                 else:
                     for permission in permissions:
-                        content += f"ID: {permission.get('id')}\n"
-                        content += f"Type: {permission.get('type')}\n"
-                        content += f"Role: {permission.get('role')}\n"
-                        
+                        parts.append(f"ID: {permission.get('id')}\n")
+                        parts.append(f"Type: {permission.get('type')}\n")
+                        parts.append(f"Role: {permission.get('role')}\n")
+
                         if permission.get('emailAddress'):
-                            content += f"Email: {permission.get('emailAddress')}\n"
-                        
+                            parts.append(f"Email: {permission.get('emailAddress')}\n")
+
                         if permission.get('displayName'):
-                            content += f"Name: {permission.get('displayName')}\n"
-                        
+                            parts.append(f"Name: {permission.get('displayName')}\n")
+
                         if permission.get('domain'):
-                            content += f"Domain: {permission.get('domain')}\n"
-                        
-                        content += "\n"
-                
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": content
-                    }]
-                }
+                            parts.append(f"Domain: {permission.get('domain')}\n")
+
+                        parts.append("\n")
+
+                return _ok(''.join(parts))
             except Exception as e:
                 logger.error(f"Error listing permissions: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error listing permissions: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error listing permissions: {e}")
         
         # Create document
         @self.server.tool("create-doc", CreateDocInput)
         async def create_doc(input_data):
             try:
-                # Create a new document
-                doc = docs_service.documents().create(
+                # Create a new document; only the ID is needed from the
+                # response, not the full empty-document resource
+                doc = _documents().create(
                     body={
                         'title': input_data.title
-                    }
+                    },
+                    fields='documentId'
                 ).execute()
                 
                 document_id = doc.get('documentId')
                 
                 # If content was provided, add it to the document
                 if input_data.content:
-                    docs_service.documents().batchUpdate(
+                    _documents().batchUpdate(
                         documentId=document_id,
                         body={
                             'requests': [
@@ -810,21 +1072,12 @@ class GoogleDriveMcpServer:
                         }
                     ).execute()
                 
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Document created successfully!\nTitle: {input_data.title}\nDocument ID: {document_id}\nYou can now reference this document using: googledocs://{document_id}"
-                    }]
-                }
+                _invalidate_listings()
+
+                return _ok(f"Document created successfully!\nTitle: {input_data.title}\nDocument ID: {document_id}\nYou can now reference this document using: googledocs://{document_id}")
             except Exception as e:
                 logger.error(f"Error creating document: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error creating document: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error creating document: {e}")
         
         # Update document
         @self.server.tool("update-doc", UpdateDocInput)
@@ -835,308 +1088,307 @@ class GoogleDriveMcpServer:
                     raise ValueError("Document ID is required")
                 
                 if input_data.replace_all:
-                    # First, get the document to find its length
-                    doc = docs_service.documents().get(
-                        documentId=input_data.doc_id
-                    ).execute()
-                    
-                    # Calculate the document length
-                    document_length = 1  # Start at 1 (the first character position)
-                    if doc.get('body') and doc.get('body').get('content'):
-                        for element in doc['body']['content']:
-                            if 'paragraph' in element:
-                                for paragraph_element in element['paragraph']['elements']:
-                                    if 'textRun' in paragraph_element and 'content' in paragraph_element['textRun']:
-                                        document_length += len(paragraph_element['textRun']['content'])
-                    
-                    # Delete all content and then insert new content
-                    docs_service.documents().batchUpdate(
-                        documentId=input_data.doc_id,
-                        body={
-                            'requests': [
-                                {
-                                    'deleteContentRange': {
-                                        'range': {
-                                            'startIndex': 1,
-                                            'endIndex': document_length
-                                        }
-                                    }
-                                },
-                                {
-                                    'insertText': {
-                                        'location': {
-                                            'index': 1
-                                        },
-                                        'text': input_data.content
-                                    }
+                    # Fetch only the final endIndex instead of the whole
+                    # document body; that is all the delete range needs, so
+                    # the response stays KB-sized regardless of document
+                    # length, and the delete + insert ship as one batchUpdate
+                    doc = await asyncio.to_thread(
+                        _execute_threaded,
+                        _documents().get(
+                            documentId=input_data.doc_id,
+                            fields='body(content(endIndex))'
+                        )
+                    )
+
+                    # The last structural element's endIndex covers the
+                    # trailing newline, which cannot be deleted
+                    end_index = doc['body']['content'][-1]['endIndex']
+
+                    requests = []
+                    if end_index > 2:
+                        requests.append({
+                            'deleteContentRange': {
+                                'range': {
+                                    'startIndex': 1,
+                                    'endIndex': end_index - 1
                                 }
-                            ]
+                            }
+                        })
+                    requests.append({
+                        'insertText': {
+                            'location': {
+                                'index': 1
+                            },
+                            'text': input_data.content
                         }
-                    ).execute()
+                    })
+
+                    await asyncio.to_thread(
+                        _execute_threaded,
+                        _documents().batchUpdate(
+                            documentId=input_data.doc_id,
+                            body={'requests': requests}
+                        )
+                    )
                 else:
-                    # Append content to the end of the document
-                    doc = docs_service.documents().get(
-                        documentId=input_data.doc_id
-                    ).execute()
-                    
-                    # Calculate the document length to append at the end
-                    document_length = 1  # Start at 1 (the first character position)
-                    if doc.get('body') and doc.get('body').get('content'):
-                        for element in doc['body']['content']:
-                            if 'paragraph' in element:
-                                for paragraph_element in element['paragraph']['elements']:
-                                    if 'textRun' in paragraph_element and 'content' in paragraph_element['textRun']:
-                                        document_length += len(paragraph_element['textRun']['content'])
-                    
-                    # Append content at the end
-                    docs_service.documents().batchUpdate(
-                        documentId=input_data.doc_id,
-                        body={
-                            'requests': [
-                                {
-                                    'insertText': {
-                                        'location': {
-                                            'index': document_length
-                                        },
-                                        'text': input_data.content
+                    # endOfSegmentLocation resolves the insertion point on
+                    # the server, so appending needs no documents().get and
+                    # no O(document-size) traversal at all
+                    await asyncio.to_thread(
+                        _execute_threaded,
+                        _documents().batchUpdate(
+                            documentId=input_data.doc_id,
+                            body={
+                                'requests': [
+                                    {
+                                        'insertText': {
+                                            'endOfSegmentLocation': {},
+                                            'text': input_data.content
+                                        }
                                     }
-                                }
-                            ]
-                        }
-                    ).execute()
+                                ]
+                            }
+                        )
+                    )
                 
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Document updated successfully!\nDocument ID: {input_data.doc_id}"
-                    }]
-                }
+                _file_meta_invalidate(input_data.doc_id)
+
+                return _ok(f"Document updated successfully!\nDocument ID: {input_data.doc_id}")
             except Exception as e:
                 logger.error(f"Error updating document: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error updating document: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error updating document: {e}")
         
         # Search documents
         @self.server.tool("search-docs", SearchDocsInput)
         async def search_docs(input_data):
             try:
-                response = drive_service.files().list(
-                    q=f"mimeType='application/vnd.google-apps.document' and fullText contains '{input_data.query}'",
+                # Escaping keeps apostrophes in the query from breaking the
+                # request (each failure costs a full error round-trip), and
+                # server-side ordering beats sorting client-side
+                response = _files().list(
+                    q=f"{_Q_DOCS} and fullText contains '{_escape_query_term(input_data.query)}'",
                     fields="files(id, name, createdTime, modifiedTime)",
+                    orderBy='modifiedTime desc',
                     pageSize=10
                 ).execute()
                 
                 files = response.get('files', [])
-                content = f"Search results for \"{input_data.query}\":\n\n"
-                
+                parts = [f"Search results for \"{input_data.query}\":\n\n"]
+
                 if not files:
-                    content += "No documents found matching your query."
+                    parts.append("No documents found matching your query.")
                 else:
                     for file in files:
-                        content += f"Title: {file.get('name')}\n"
-                        content += f"ID: {file.get('id')}\n"
-                        content += f"Created: {file.get('createdTime')}\n"
-                        content += f"Last Modified: {file.get('modifiedTime')}\n\n"
-                
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": content
-                    }]
-                }
+                        parts.append(f"Title: {file.get('name')}\n")
+                        parts.append(f"ID: {file.get('id')}\n")
+                        parts.append(f"Created: {file.get('createdTime')}\n")
+                        parts.append(f"Last Modified: {file.get('modifiedTime')}\n\n")
+
+                return _ok(''.join(parts))
             except Exception as e:
                 logger.error(f"Error searching documents: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error searching documents: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error searching documents: {e}")
         
         # Delete document
         @self.server.tool("delete-doc", DeleteDocInput)
         async def delete_doc(input_data):
             try:
-                # Get the document title first for confirmation
-                doc = docs_service.documents().get(
-                    documentId=input_data.doc_id
-                ).execute()
-                title = doc.get('title')
-                
-                # Delete the document
-                drive_service.files().delete(
-                    fileId=input_data.doc_id
-                ).execute()
-                
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Document \"{title}\" (ID: {input_data.doc_id}) has been successfully deleted."
-                    }]
-                }
+                # The title only feeds the confirmation message. Fetching it
+                # concurrently with the delete raced: a fast delete made the
+                # get 404 and the tool reported failure for a successful
+                # deletion. The get is a tiny fields='title' call, so it
+                # runs first — and a failed lookup is tolerated, because
+                # deleting is the job, not naming.
+                title = None
+                try:
+                    doc = await asyncio.to_thread(
+                        _execute_threaded,
+                        _documents().get(
+                            documentId=input_data.doc_id,
+                            fields='title'
+                        )
+                    )
+                    title = doc.get('title')
+                except Exception as title_error:
+                    logger.warning(f"Could not fetch title before deleting {input_data.doc_id}: {title_error}")
+
+                await asyncio.to_thread(
+                    _execute_threaded,
+                    _files().delete(
+                        fileId=input_data.doc_id
+                    )
+                )
+
+                _invalidate_listings()
+                _file_meta_invalidate(input_data.doc_id)
+
+                if title:
+                    return _ok(f"Document \"{title}\" (ID: {input_data.doc_id}) has been successfully deleted.")
+                return _ok(f"Document (ID: {input_data.doc_id}) has been successfully deleted.")
             except Exception as e:
                 logger.error(f"Error deleting document {input_data.doc_id}: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error deleting document: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error deleting document: {e}")
         
         # Export document
         @self.server.tool("export-doc", ExportDocInput)
         async def export_doc(input_data):
             try:
-                # Get the document metadata
-                doc_metadata = drive_service.files().get(
+                export_request = _files().export_media(
                     fileId=input_data.doc_id,
-                    fields='name,mimeType'
-                ).execute()
-                
-                # Check if it's a Google Doc
-                if doc_metadata.get('mimeType') != 'application/vnd.google-apps.document':
-                    raise ValueError('The provided ID is not a Google Doc')
-                
-                # Map format to mimeType
-                mime_type_map = {
-                    'pdf': 'application/pdf',
-                    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                    'txt': 'text/plain',
-                    'html': 'text/html',
-                    'odt': 'application/vnd.oasis.opendocument.text',
-                    'rtf': 'application/rtf',
-                    'epub': 'application/epub+zip'
-                }
-                
-                # Export the file
-                response = drive_service.files().export_media(
-                    fileId=input_data.doc_id,
-                    mimeType=mime_type_map[input_data.format]
-                ).execute()
-                
-                # Create base64 of the content
-                base64_content = base64.b64encode(response).decode('utf-8')
+                    mimeType=EXPORT_MIME_TYPES[input_data.format]
+                )
+
+                def _export_stream():
+                    # Stream the export in 4 MiB chunks with incremental
+                    # base64 instead of one huge execute() allocation
+                    return _download_media_base64(
+                        export_request, chunksize=4 * 1024 * 1024
+                    )
+
+                doc_metadata = _file_meta_get(input_data.doc_id)
+                if doc_metadata is not None:
+                    # Check if it's a Google Doc before exporting at all
+                    if doc_metadata.get('mimeType') != 'application/vnd.google-apps.document':
+                        raise ValueError('The provided ID is not a Google Doc')
+                    export_result = await asyncio.to_thread(_export_stream)
+                else:
+                    # The metadata fetch and the export are independent, so
+                    # run them concurrently (media downloads cannot go
+                    # through the batch endpoint). return_exceptions lets
+                    # the mimeType check below produce the clearer error
+                    # when the ID is not a Doc.
+                    doc_metadata, export_result = await asyncio.gather(
+                        asyncio.to_thread(
+                            _execute_threaded,
+                            _files().get(
+                                fileId=input_data.doc_id,
+                                fields='name,mimeType'
+                            )
+                        ),
+                        asyncio.to_thread(_export_stream),
+                        return_exceptions=True,
+                    )
+
+                    if isinstance(doc_metadata, BaseException):
+                        raise doc_metadata
+                    _file_meta_put(input_data.doc_id, doc_metadata)
+
+                    # Check if it's a Google Doc
+                    if doc_metadata.get('mimeType') != 'application/vnd.google-apps.document':
+                        raise ValueError('The provided ID is not a Google Doc')
+
+                    if isinstance(export_result, BaseException):
+                        raise export_result
+
+                base64_content, export_size = export_result
                 
                 # Generate export filename
                 original_name = doc_metadata.get('name') or 'document'
                 export_name = f"{original_name}.{input_data.format}"
                 
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Google Doc successfully exported to {input_data.format.upper()} format.\nOriginal document: {original_name}\nExported as: {export_name}\nSize: {len(response)} bytes"
-                    }],
-                    "exportData": {
+                return _ok(
+                    f"Google Doc successfully exported to {input_data.format.upper()} format.\nOriginal document: {original_name}\nExported as: {export_name}\nSize: {export_size} bytes",
+                    exportData={
                         "name": export_name,
-                        "mimeType": mime_type_map[input_data.format],
+                        "mimeType": EXPORT_MIME_TYPES[input_data.format],
                         "base64Content": base64_content
                     }
-                }
+                )
             except Exception as e:
                 logger.error(f"Error exporting document: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error exporting document: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error exporting document: {e}")
         
         # Batch upload
         @self.server.tool("upload-batch", UploadBatchInput)
         async def upload_batch(input_data):
             try:
-                results = []
-                errors = []
-                
-                # Process each file
-                for file in input_data.files:
-                    try:
-                        # Create a temporary file path
-                        temp_path = get_temp_file('batch-upload-')
-                        
-                        # Decode and write content to temp file
-                        file_content = base64.b64decode(file.base64_content)
-                        with open(temp_path, 'wb') as f:
-                            f.write(file_content)
-                        
-                        # Setup file metadata
-                        file_metadata = {
-                            'name': file.name
-                        }
-                        
-                        if input_data.folder_id:
-                            file_metadata['parents'] = [input_data.folder_id]
-                        
-                        # Upload the file
-                        media = MediaFileUpload(
-                            temp_path,
-                            mimetype=file.mime_type,
-                            resumable=True
-                        )
-                        
-                        response = drive_service.files().create(
-                            body=file_metadata,
-                            media_body=media,
-                            fields='id,name,webViewLink'
-                        ).execute()
-                        
-                        # Clean up
-                        os.unlink(temp_path)
-                        
-                        # Save the result
-                        results.append({
-                            'name': file.name,
-                            'id': response.get('id'),
-                            'link': response.get('webViewLink')
-                        })
-                    except Exception as err:
-                        errors.append({
-                            'name': file.name,
-                            'error': str(err)
-                        })
+                # Each upload spends most of its wall time waiting on Drive
+                # round-trips, so run a bounded number concurrently; the
+                # semaphore caps memory and keeps Drive from throttling us
+                sem = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
+
+                def _upload_one_sync(file):
+                    # Decode straight into memory; the old temp-file path
+                    # wrote and re-read every payload through the kernel.
+                    # This runs in a worker thread, and CPython's base64
+                    # releases the GIL, so decodes genuinely overlap both
+                    # each other and in-flight uploads
+                    file_content = _b64decode(file.base64_content)
+
+                    # Setup file metadata
+                    file_metadata = {
+                        'name': file.name
+                    }
+
+                    if input_data.folder_id:
+                        file_metadata['parents'] = [input_data.folder_id]
+
+                    # Small files go as one simple POST; large ones use the
+                    # resumable protocol with 8 MiB chunks
+                    media = MediaIoBaseUpload(
+                        io.BytesIO(file_content),
+                        mimetype=file.mime_type,
+                        chunksize=UPLOAD_CHUNK_SIZE,
+                        resumable=len(file_content) >= SIMPLE_UPLOAD_LIMIT
+                    )
+
+                    return _files().create(
+                        body=file_metadata,
+                        media_body=media,
+                        fields='id,name,webViewLink'
+                    ).execute(http=_get_thread_http())
+
+                async def _upload_one(file):
+                    # Per-file error isolation: one failure never aborts the
+                    # rest of the batch
+                    async with sem:
+                        try:
+                            response = await asyncio.to_thread(_upload_one_sync, file)
+                            return 'ok', {
+                                'name': file.name,
+                                'id': response.get('id'),
+                                'link': response.get('webViewLink')
+                            }
+                        except Exception as err:
+                            return 'err', {
+                                'name': file.name,
+                                'error': str(err)
+                            }
+
+                outcomes = await asyncio.gather(
+                    *[_upload_one(file) for file in input_data.files]
+                )
+                results = [payload for status, payload in outcomes if status == 'ok']
+                errors = [payload for status, payload in outcomes if status == 'err']
                 
+                if results:
+                    _invalidate_listings()
+
                 # Build response content
-                content = "Batch upload results:\n\n"
-                content += f"Successfully uploaded {len(results)} of {len(input_data.files)} files.\n\n"
-                
+                parts = ["Batch upload results:\n\n"]
+                parts.append(f"Successfully uploaded {len(results)} of {len(input_data.files)} files.\n\n")
+
                 if results:
-                    content += "Successful uploads:\n"
+                    parts.append("Successful uploads:\n")
                     for result in results:
-                        content += f"- {result['name']}: {result['id']} ({result['link']})\n"
-                    content += "\n"
-                
+                        parts.append(f"- {result['name']}: {result['id']} ({result['link']})\n")
+                    parts.append("\n")
+
                 if errors:
-                    content += "Failed uploads:\n"
+                    parts.append("Failed uploads:\n")
                     for error in errors:
-                        content += f"- {error['name']}: {error['error']}\n"
-                
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": content
-                    }],
-                    "uploadResults": {
+                        parts.append(f"- {error['name']}: {error['error']}\n")
+
+                return _ok(
+                    ''.join(parts),
+                    uploadResults={
                         "successful": results,
                         "failed": errors
                     }
-                }
+                )
             except Exception as e:
                 logger.error(f"Error in batch upload: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error in batch upload: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error in batch upload: {e}")
         
         # Send file content email
         @self.server.tool("send-file-email", SendFileContentEmailInput)
@@ -1156,111 +1408,128 @@ class GoogleDriveMcpServer:
                     # Use global config loaded from config file
                     email_config = EMAIL_CONFIG
                 
-                # Check for required file
-                if not os.path.exists(input_data.file_path):
-                    raise FileNotFoundError(f"File not found: {input_data.file_path}")
-                
-                # Send the email
+                # File existence and address syntax are guaranteed by the
+                # input model, so the handler goes straight to sending
                 success = send_file_content_email(
                     email_config,
                     input_data.to_email,
                     input_data.subject,
-                    input_data.file_path,
+                    str(input_data.file_path),
                     input_data.cc_emails,
                     input_data.include_dummy_stl
                 )
                 
                 if success:
-                    return {
-                        "content": [{
-                            "type": "text",
-                            "text": f"Email sent successfully!\n\nTo: {input_data.to_email}\nSubject: {input_data.subject}\nFile: {os.path.basename(input_data.file_path)}\nIncluded dummy STL: {'Yes' if input_data.include_dummy_stl else 'No'}"
-                        }]
-                    }
+                    return _ok(f"Email sent successfully!\n\nTo: {input_data.to_email}\nSubject: {input_data.subject}\nFile: {os.path.basename(input_data.file_path)}\nIncluded dummy STL: {'Yes' if input_data.include_dummy_stl else 'No'}")
                 else:
-                    return {
-                        "content": [{
-                            "type": "text",
-                            "text": "Failed to send email. Check SMTP settings and ensure they are correctly configured in config.json, environment variables, or provided in the request."
-                        }],
-                        "isError": True
-                    }
+                    return _err("Failed to send email. Check SMTP settings and ensure they are correctly configured in config.json, environment variables, or provided in the request.")
             except Exception as e:
                 logger.error(f"Error sending email: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error sending email: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error sending email: {e}")
         
         # Upload file from URL
         @self.server.tool("upload-file-from-url", UploadFileFromUrlInput)
         async def upload_file_from_url(input_data):
             try:
-                import urllib.request
-                
-                # Create a temporary file path
-                temp_path = get_temp_file('upload-url-')
-                
-                # Fetch the file content from URL
+                # Stream the URL body straight into the upload source: into
+                # memory for modest files (no temp-file write/read round
+                # trip), spilling to disk only for very large downloads
+                temp_path = None
                 try:
-                    urllib.request.urlretrieve(input_data.url, temp_path)
+                    with _http_session.get(input_data.url, stream=True, timeout=30) as resp:
+                        resp.raise_for_status()
+                        # iter_content applies content decoding (the pooled
+                        # session advertises gzip/deflate), so what lands
+                        # here are the file's real bytes — copying resp.raw
+                        # would upload compressed bytes as-is. The spill
+                        # decision is made on bytes actually written, since
+                        # Content-Length describes the compressed stream.
+                        buf = io.BytesIO()
+                        tf = None
+                        for chunk in resp.iter_content(chunk_size=1024 * 1024):
+                            if tf is None:
+                                buf.write(chunk)
+                                if buf.tell() >= URL_MEMORY_LIMIT:
+                                    tf = tempfile.NamedTemporaryFile(prefix='upload-url-', delete=False)
+                                    temp_path = tf.name
+                                    tf.write(buf.getbuffer())
+                                    buf = None
+                            else:
+                                tf.write(chunk)
+                        if tf is not None:
+                            tf.close()
+                        else:
+                            buf.seek(0)
                 except Exception as url_error:
+                    # A connection reset mid-spill must not leak the
+                    # partially written temp file; the upload-phase finally
+                    # below never runs on this path
+                    if temp_path:
+                        try:
+                            tf.close()
+                        except Exception:
+                            pass
+                        try:
+                            os.unlink(temp_path)
+                        except OSError:
+                            pass
+                        temp_path = None
                     raise ValueError(f"Failed to fetch file from URL: {str(url_error)}")
                 
-                # Set up file metadata
-                file_metadata = {
-                    'name': input_data.name
-                }
-                
-                if input_data.description:
-                    file_metadata['description'] = input_data.description
-                
-                if input_data.folder_id:
-                    file_metadata['parents'] = [input_data.folder_id]
-                
-                # Upload the file
-                media = MediaFileUpload(
-                    temp_path,
-                    mimetype=input_data.mime_type,
-                    resumable=True
-                )
-                
-                response = drive_service.files().create(
-                    body=file_metadata,
-                    media_body=media,
-                    fields='id, name, webViewLink, mimeType, size'
-                ).execute()
-                
-                # Clean up the temporary file
-                os.unlink(temp_path)
+                try:
+                    # Set up file metadata
+                    file_metadata = {
+                        'name': input_data.name
+                    }
+                    
+                    if input_data.description:
+                        file_metadata['description'] = input_data.description
+                    
+                    if input_data.folder_id:
+                        file_metadata['parents'] = [input_data.folder_id]
+                    
+                    # Upload the file. Disk-spilled downloads are by
+                    # definition large, so they always use the resumable
+                    # protocol; in-memory bodies below the simple-upload
+                    # limit go as one POST, skipping the session-initiation
+                    # round-trip
+                    if temp_path:
+                        media = MediaFileUpload(
+                            temp_path,
+                            mimetype=input_data.mime_type,
+                            resumable=True,
+                            chunksize=UPLOAD_CHUNK_SIZE
+                        )
+                    else:
+                        media = MediaIoBaseUpload(
+                            buf,
+                            mimetype=input_data.mime_type,
+                            resumable=buf.getbuffer().nbytes >= SIMPLE_UPLOAD_LIMIT,
+                            chunksize=UPLOAD_CHUNK_SIZE
+                        )
+                    
+                    response = _files().create(
+                        body=file_metadata,
+                        media_body=media,
+                        fields='id, name, webViewLink, mimeType, size'
+                    ).execute()
+                finally:
+                    # Clean up the temporary file even when the upload fails,
+                    # so repeated failures cannot exhaust /tmp
+                    if temp_path:
+                        os.unlink(temp_path)
                 
+                _invalidate_listings()
+
                 # Format size information
                 size_str = f"{response.get('size', 'unknown')} bytes"
                 if response.get('size'):
-                    size_bytes = int(response.get('size'))
-                    if size_bytes > 1024 * 1024:
-                        size_str = f"{size_bytes / (1024 * 1024):.2f} MB"
-                    elif size_bytes > 1024:
-                        size_str = f"{size_bytes / 1024:.2f} KB"
+                    size_str = _format_size(int(response.get('size')))
                 
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"File uploaded successfully from URL!\nName: {response.get('name')}\nFile ID: {response.get('id')}\nType: {response.get('mimeType')}\nSize: {size_str}\nLink: {response.get('webViewLink')}"
-                    }]
-                }
+                return _ok(f"File uploaded successfully from URL!\nName: {response.get('name')}\nFile ID: {response.get('id')}\nType: {response.get('mimeType')}\nSize: {size_str}\nLink: {response.get('webViewLink')}")
             except Exception as e:
                 logger.error(f"Error uploading file from URL: {e}")
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": f"Error uploading file from URL: {e}"
-                    }],
-                    "isError": True
-                }
+                return _err(f"Error uploading file from URL: {e}")
     
     def register_prompts(self):
         """Register MCP prompts."""
@@ -1322,8 +1591,6 @@ class GoogleDriveMcpServer:
 
 
 if __name__ == "__main__":
-    import asyncio
-    
     # Create and start the server
     server = GoogleDriveMcpServer()
     
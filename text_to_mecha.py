@@ -1,5 +1,10 @@
 import asyncio
+import atexit
+import functools
+import hashlib
 import os
+import shutil
+import tempfile
 from typing import List, Dict, Any, Union
 from contextlib import AsyncExitStack
 import json # Added import
@@ -13,18 +18,277 @@ from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.prebuilt import create_react_agent
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 # from IPython.display import Image, display # May not be necessary in Gradio
 import re
 import base64
+import binascii
+
+# Optional SIMD-accelerated base64 (libbase64 via pybase64); the modeling
+# step decodes multi-MB PNG payloads, which is exactly where it pays off.
+# The stdlib fallback goes straight to binascii.a2b_base64, skipping the
+# altchars-translation wrapper that base64.b64decode layers on top.
+try:
+    import pybase64
+    _b64decode = pybase64.b64decode
+except ImportError:
+    _b64decode = binascii.a2b_base64
+
+# Optional SIMD-accelerated JSON parse for export payloads that embed
+# multi-MB base64 strings; stdlib json is the fallback.
+try:
+    import orjson
+    _fast_json_loads = orjson.loads
+except ImportError:
+    _fast_json_loads = json.loads
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _find_embedded_json(text: str, required_key: str):
+    """Recovers the first embedded JSON object containing `required_key`.
+
+    Scans forward from each '{' with JSONDecoder.raw_decode — linear in the
+    text length, and unlike the previous regex it handles nested braces and
+    escaped quotes correctly. Returns the parsed dict or None.
+    """
+    # Fast path: tool responses are usually a bare JSON object, which
+    # orjson (when installed) parses several times faster than the
+    # incremental decoder on base64-heavy payloads
+    stripped = text.strip()
+    if stripped.startswith('{') and stripped.endswith('}'):
+        try:
+            obj = _fast_json_loads(stripped)
+            if isinstance(obj, dict) and required_key in obj:
+                return obj
+        except ValueError:
+            pass
+
+    idx = 0
+    while (pos := text.find('{', idx)) != -1:
+        try:
+            obj, end = _JSON_DECODER.raw_decode(text, pos)
+        except ValueError:
+            idx = pos + 1
+            continue
+        if isinstance(obj, dict) and required_key in obj:
+            return obj
+        # Parsed something else (or a wrapper); also try nested objects
+        idx = pos + 1
+    return None
+
+# Failure sentinels produced by the step methods; when a step's output
+# starts with one of these, the documentation LLM call is skipped and a
+# templated error proposal is rendered instead.
+_ERR_PREFIXES = ("An error occurred", "Failed to initialize")
+
+
+def _render_error_proposal(user_query: str, calculation_output: str, modeling_error: str) -> str:
+    """Pure-template proposal for the error path — no LLM call needed."""
+    return f"""# Design Proposal (incomplete)
+
+The design flow did not complete successfully, so no full proposal was generated.
+
+## Original user request
+
+{user_query}
+
+## Design calculation output
+
+{calculation_output}
+
+## 3D modeling status
+
+{modeling_error or 'Not reached.'}
+
+## Next steps
+
+Please review the errors above, adjust the request if needed, and try again.
+"""
+
+
+# Stable instruction preamble for the modeling agent. Kept constant (no
+# per-call values interpolated) and marked with cache_control so Anthropic
+# serves its KV prefix from the server-side prompt cache on every react
+# iteration after the first, and across runs with the same spec.
+_MODELING_PREAMBLE = """You are a 3D modeling agent working in FreeCAD.
+
+Create a 3D model based on the given specifications in the named document.
+Make sure the primary object you create or modify uses the requested object name.
+
+Do not export the object or take screenshots yourself — the system performs
+the export and the screenshot in a single step after you finish. When the
+model is complete, reply with a short summary of what was built."""
+
+# Fixed documentation instructions; constant so the prompt-cache prefix
+# is byte-identical across runs. The per-run facts arrive as one JSON
+# payload in the human message.
+_DOCUMENTATION_SYSTEM = """You are a design-proposal writer. You receive a JSON payload with the user's request and the calculated specifications. Produce a Markdown design proposal document, to be saved as 'proposal.md', with these sections:
+1. Summary of user request
+2. Proposed specifications (mechanical specs, etc.)
+3. Design points and rationale
+4. Information about the 3D model
+5. Next steps or recommendations (if any)
+The 3D model is still being generated while you write, so the body of section 4 must be exactly the placeholder line <<MODEL_STATUS>> and nothing else; it is substituted with the real status afterwards."""
+
+# Placeholder token the documentation model is told to emit for section 4;
+# _finalize_documentation swaps it for the actual modeling status once the
+# concurrent modeling step has finished.
+_MODEL_STATUS_PLACEHOLDER = "<<MODEL_STATUS>>"
+
+
+# FreeCAD-side script that exports the object AND takes a screenshot in one
+# execute_code round-trip, returning both blobs in a single JSON payload.
+# Callers prepend DOC_NAME/OBJ_NAME/EXPORT_NAME assignments; keeping the
+# body constant avoids brace-escaping and per-call string rebuilds.
+_EXPORT_SNAPSHOT_BODY = '''
+import FreeCAD
+import base64
+import json
+import os
+import tempfile
+
+result = {"file_content_b64": None, "file_name": None, "image_b64": None, "error": None}
+try:
+    doc = FreeCAD.getDocument(DOC_NAME)
+    obj = doc.getObject(OBJ_NAME)
+    if obj is None and doc.Objects:
+        obj = doc.Objects[-1]
+    if obj is None:
+        result["error"] = "No object found to export."
+    else:
+        import Import
+        fd, tmp = tempfile.mkstemp(suffix=os.path.splitext(EXPORT_NAME)[1])
+        os.close(fd)
+        try:
+            Import.export([obj], tmp)
+            with open(tmp, 'rb') as f:
+                result["file_content_b64"] = base64.b64encode(f.read()).decode('ascii')
+            result["file_name"] = EXPORT_NAME
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+except Exception as e:
+    result["error"] = str(e)
+
+try:
+    if FreeCAD.Gui.ActiveDocument and FreeCAD.Gui.ActiveDocument.ActiveView:
+        view = FreeCAD.Gui.ActiveDocument.ActiveView
+        if hasattr(view, 'saveImage'):
+            fd, img_tmp = tempfile.mkstemp(suffix='.png')
+            os.close(fd)
+            try:
+                view.saveImage(img_tmp, 1920, 1080, 'White')
+                if os.path.exists(img_tmp) and os.path.getsize(img_tmp) > 0:
+                    with open(img_tmp, 'rb') as f:
+                        result["image_b64"] = base64.b64encode(f.read()).decode('ascii')
+            finally:
+                if os.path.exists(img_tmp):
+                    os.remove(img_tmp)
+except Exception as e:
+    if not result["error"]:
+        result["error"] = str(e)
+
+print(json.dumps(result))
+'''
+
+# FreeCAD-side script for the fallback screenshot, shipped through the MCP
+# execute_code tool. Hoisted to a constant so the error path does not
+# rebuild the ~40-line string per failure; it runs inside the FreeCAD
+# process, so names like FreeCADGui resolve there, not here.
+# Code inspired by FreeCADConnection.get_active_screenshot and export_object
+_FALLBACK_SS_CODE = '''
+import FreeCAD
+import FreeCADGui
+import base64
+import os
+import tempfile
+
+img_b64 = None
+error_msg = None
+try:
+    if FreeCAD.Gui.ActiveDocument and FreeCAD.Gui.ActiveDocument.ActiveView:
+        view = FreeCAD.Gui.ActiveDocument.ActiveView
+        view_type = type(view).__name__
+        unsupported_views = ['SpreadsheetGui::SheetView', 'DrawingGui::DrawingView', 'TechDrawGui::MDIViewPage']
+        
+        if view_type in unsupported_views or not hasattr(view, 'saveImage'):
+            error_msg = f"Current view ({view_type}) does not support screenshots."
+        else:
+            # Create a temporary file to save the image
+            # JPEG at 1024x768: the payload rides back over stdio as
+            # base64, so a 4-10x smaller image dominates fallback latency
+            fd, temp_image_path = tempfile.mkstemp(suffix='.jpg', prefix='freecad_ss_')
+            os.close(fd) # We only need the path
+            try:
+                view.saveImage(temp_image_path, 1024, 768, 'White')
+                if os.path.exists(temp_image_path) and os.path.getsize(temp_image_path) > 0:
+                    with open(temp_image_path, 'rb') as f:
+                        img_b64 = base64.b64encode(f.read()).decode('utf-8')
+                else:
+                    error_msg = "saveImage executed but file not created or empty."
+            except Exception as e_save:
+                error_msg = f"Error during view.saveImage: {str(e_save)}"
+            finally:
+                if os.path.exists(temp_image_path):
+                    try:
+                        os.remove(temp_image_path)
+                    except Exception as e_clean:
+                        print(f"Warning: Failed to remove temp_image_path {temp_image_path}: {str(e_clean)}") # Print on FreeCAD side
+    elif not FreeCAD.ActiveDocument:
+        error_msg = "No active document in FreeCAD to take screenshot from."
+    else: # ActiveDocument exists, but no ActiveView
+        error_msg = "No active view in FreeCADGui to take screenshot from."
+except Exception as e_outer:
+    error_msg = f"Outer error during screenshot script: {str(e_outer)}"
+
+if img_b64:
+    print(f"data:image/jpeg;base64,{img_b64}") # Output base64 string directly
+else:
+    print(f"Error: {error_msg}") # Output error message
+'''
+
+# Dimension tokens like "120 mm" / "3.5 in"; used to judge whether a
+# calculation output is already compact and geometry-rich enough to feed
+# the modeling agent directly, skipping the extraction LLM call.
+_DIMENSION_RE = re.compile(r"\b\d+(?:\.\d+)?\s*(?:mm|cm|m|in)\b")
+
+_B64_IMG_PREFIXES = ('data:image/png;base64,', 'data:image/jpeg;base64,')
+_B64_PAYLOAD_RE = re.compile(r'[A-Za-z0-9+/=]+')
+
+
+def _find_b64_image(content: str):
+    """Locates a data:image/png;base64 payload in `content` and returns the
+    bare base64 payload (without the data-URI prefix), or None.
+
+    str.find() (memchr-speed) locates the prefix, then an anchored match()
+    of the payload character class runs strictly linearly from that offset —
+    no document-wide regex scan and no backtracking or capture bookkeeping
+    on multi-MB strings. Returning only the payload means exactly one
+    substring copy; callers no longer re-split to strip the prefix.
+    """
+    for prefix in _B64_IMG_PREFIXES:
+        idx = content.find(prefix)
+        if idx < 0:
+            continue
+        m = _B64_PAYLOAD_RE.match(content, idx + len(prefix))
+        if m:
+            return content[idx + len(prefix):m.end()]
+    return None
 
 # Load environment variables from .env file (OpenAI API key, etc.)
 from dotenv import load_dotenv
 load_dotenv()
 
-# asyncio event loop setup
-loop = asyncio.new_event_loop()
-asyncio.set_event_loop(loop)
+# Exact-match LLM response cache: repeat runs with identical prompts (same
+# spec, same doc boilerplate) are answered from SQLite in milliseconds
+# instead of paying a full Anthropic round-trip.
+try:
+    from langchain.globals import set_llm_cache
+    from langchain_community.cache import SQLiteCache
+    set_llm_cache(SQLiteCache(database_path=".mecha_llm.db"))
+except Exception as e:
+    print(f"Warning: LLM response cache unavailable: {e}")
 
 # --- Email Sending Integration ---
 # Assuming email_sender.py is in yc_mcp_hackathon/python_mcp_gdrive/
@@ -43,6 +307,178 @@ DEFAULT_EMAIL_TO = "hiro.saxophone@gmail.com" # Please change this to your desir
 
 DEFAULT_EMAIL_SUBJECT = "Design Proposal and Artifacts"
 MODEL_EXPORTS_DIR = "model_exports"
+# With EXPORT_TO_DISK=0, generated artifacts go to throwaway temp files
+# instead of accumulating under model_exports/ — useful for stateless or
+# container deployments. Default keeps the persistent folder.
+EXPORT_TO_DISK = os.getenv("EXPORT_TO_DISK", "1") != "0"
+
+def _message_text(content) -> str:
+    """Flattens a message/tool content payload (str or content-block list) to text."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for block in content:
+            if isinstance(block, str):
+                parts.append(block)
+            elif isinstance(block, dict):
+                parts.append(block.get("text", ""))
+            elif hasattr(block, "text"):
+                parts.append(block.text)
+        return "".join(parts)
+    if hasattr(content, "text"):
+        return content.text
+    return "" if content is None else str(content)
+
+
+def _artifact_path(filename: str) -> str:
+    """Resolves where a generated artifact (model/screenshot) is written.
+
+    Gradio chat messages and SMTP attachments both consume filesystem
+    paths, so artifacts must land on disk somewhere; this only decides
+    between the persistent exports folder and a per-run temp file.
+    """
+    if EXPORT_TO_DISK:
+        return os.path.join(MODEL_EXPORTS_DIR, filename)
+    stem, ext = os.path.splitext(filename)
+    fd, path = tempfile.mkstemp(suffix=ext, prefix=stem + "_")
+    os.close(fd)
+    return path
+
+
+def _write_b64_to_file(b64_payload: str, path: str) -> None:
+    """Decodes a base64 payload and writes it to `path`.
+
+    Synchronous on purpose: callers run it via asyncio.to_thread so the
+    decode (CPU-bound on multi-MB buffers) and the disk write both happen
+    off the event loop. The file is opened unbuffered so the decoded
+    buffer goes to the kernel in one write with no BufferedWriter layer.
+    Truncated payloads are re-padded here so every call site is safe
+    against tools that strip trailing '='.
+    """
+    missing_padding = len(b64_payload) % 4
+    if missing_padding:
+        b64_payload += '=' * (4 - missing_padding)
+    with open(path, "wb", buffering=0) as f:
+        f.write(_b64decode(b64_payload))
+
+
+# Keys on a modeling result that count as produced output; the Step 2
+# reporting branch checks them via any() in one pass
+_MODELING_OUTPUT_KEYS = ("image_path", "model_file_path", "screenshot_file_path")
+
+# Artifact suffixes the Clear button removes from model_exports/
+_EXPORT_SUFFIXES = (".step", ".stl", ".iges", ".brep", ".png", ".jpg")
+
+# Execution-level result cache: completed runs are indexed by a hash of
+# the normalized user query so a repeated request replays the stored
+# proposal and artifact paths instead of re-running the LLM/FreeCAD flow.
+EXECUTION_CACHE_DIR = os.path.join(MODEL_EXPORTS_DIR, "cache")
+
+
+def _execution_cache_key(user_query: str) -> str:
+    return hashlib.sha256(user_query.strip().lower().encode()).hexdigest()
+
+
+def _load_cached_execution(key: str) -> Union[dict, None]:
+    """Returns the cached run for `key`, or None on miss/stale entry.
+
+    An entry is stale when an artifact snapshot it references no longer
+    exists on disk (e.g. the cache directory was pruned by hand).
+    """
+    index_path = os.path.join(EXECUTION_CACHE_DIR, f"{key}.json")
+    try:
+        with open(index_path, "rb") as f:
+            entry = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    for path_key in ("model_file_path", "screenshot_file_path"):
+        path = entry.get(path_key)
+        if path and not os.path.exists(path):
+            return None
+    return entry
+
+
+def _store_cached_execution(key: str, entry: dict) -> None:
+    """Snapshots a run's artifacts and writes its cache entry.
+
+    The export paths are fixed per run (MainAssembly.step / _preview.png),
+    so a later query overwrites them; serving a hit straight off those
+    paths would replay the wrong model next to the cached proposal. Each
+    artifact is therefore copied under the cache key at store time and
+    the entry points at the immutable copy. The index write is atomic
+    (tempfile + rename) so a crash mid-write never leaves a truncated
+    entry behind. Synchronous on purpose: callers run it via
+    asyncio.to_thread since the copies can be multi-MB.
+    """
+    entry = dict(entry)
+    for path_key, tag in (("model_file_path", "model"), ("screenshot_file_path", "shot")):
+        src = entry.get(path_key)
+        if not src:
+            continue
+        try:
+            snapshot = os.path.join(
+                EXECUTION_CACHE_DIR, f"{key}.{tag}{os.path.splitext(src)[1]}")
+            shutil.copyfile(src, snapshot)
+            entry[path_key] = snapshot
+        except OSError as e:
+            # Without its artifact snapshot the entry would serve stale
+            # files later; skip caching this run entirely
+            print(f"Skipping execution-cache store (could not snapshot {src}): {e}")
+            return
+    index_path = os.path.join(EXECUTION_CACHE_DIR, f"{key}.json")
+    fd, tmp_path = tempfile.mkstemp(dir=EXECUTION_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _write_proposal_file(proposal_md_content: str) -> str:
+    """Writes the proposal markdown to a fresh per-session temp file.
+
+    Each turn gets its own file, so concurrent sessions never race on a
+    shared 'proposal.md' path. Returns the path for gr.File / email use.
+    Synchronous on purpose — async callers run it via asyncio.to_thread
+    so the disk write (one coalesced os.write) stays off the event loop.
+    """
+    fd, path = tempfile.mkstemp(suffix=".md", prefix="proposal_")
+    try:
+        os.write(fd, proposal_md_content.encode("utf-8"))
+    finally:
+        os.close(fd)
+    return path
+
+
+# How many raw history entries (user + assistant messages, i.e. 6 exchanges)
+# are passed verbatim to the calculation LLM; older turns are folded into a
+# rolling summary so prefill cost stays bounded as the conversation grows.
+HISTORY_WINDOW = 12
+
+
+class ConversationState:
+    """Per-session conversation caches: rolling summary + SoA history view.
+
+    One instance lives in a gr.State per browser session (like the
+    proposal path), so concurrent sessions never feed each other's
+    context into a prompt or trigger the shrink-detection rebuild
+    against another session's list. The app singleton holds only shared
+    resources (clients, tools, locks), never conversation state.
+    """
+
+    def __init__(self):
+        self.summary = ""
+        self.summarized_turns = 0
+        # Incrementally maintained columnar (SoA) view of the conversation:
+        # parallel lists of user and assistant texts per exchange. Windowing
+        # is a pair of list slices, and message objects are built only for
+        # the windowed tail instead of the whole history.
+        self.user_msgs: List[str] = []
+        self.asst_msgs: List[str] = []
+        self.hist_converted_upto = 0
 # --- End Email Sending Integration ---
 
 class LangchainMCPApp:
@@ -50,15 +486,45 @@ class LangchainMCPApp:
         self.mcp_client = None
         self.modeling_agent = None # Agent for 3D modeling
         self.exit_stack = None
-
-        # Initialize each LLM model (here, assuming the same model is used and roles are differentiated by prompts)
-        # Can be changed to different models or settings as needed
-        self.calculation_model = ChatAnthropic(model="claude-3-7-sonnet-20250219") # LLM for design calculations
-        self.documentation_model = ChatAnthropic(model="claude-3-7-sonnet-20250219") # LLM for document generation
+        # Tool list and name lookup cached at init; get_tools() rebuilds
+        # LangChain wrappers every call, so hot paths use these instead
+        self._tools = []
+        self._tool_by_name: Dict[str, Any] = {}
+        # Create the exports directory once here instead of re-checking it
+        # on every save inside the modeling step
+        os.makedirs(EXECUTION_CACHE_DIR, exist_ok=True)  # also creates MODEL_EXPORTS_DIR
+        # Serializes agent initialization: concurrent callers (warmup +
+        # modeling step, or several sessions) must not each spawn their own
+        # MCP subprocesses — uvx/npx cold starts cost seconds apiece
+        self._init_lock = asyncio.Lock()
+        # Caps concurrent Anthropic calls across all sessions and steps so
+        # overlapping turns multiplex without tripping rate limits; sized
+        # to the account's rate tier via ANTHROPIC_CONCURRENCY
+        self._llm_semaphore = asyncio.Semaphore(int(os.getenv("ANTHROPIC_CONCURRENCY", "4")))
+        # Memo for modeling-parameter extraction keyed on the normalized
+        # calculation output: re-running the pipeline on the same spec
+        # (common during demos and retries) skips the LLM call entirely
+        self._extract_cache: Dict[str, str] = {}
+
+        # One shared client for all three roles: they use the same model, and
+        # the roles are differentiated by prompts, so separate instances only
+        # multiplied HTTP connection pools and TLS handshakes. The role
+        # attributes stay as aliases so call sites read the same and a role
+        # can be re-pointed at a different model later without touching them.
+        self._anthropic = ChatAnthropic(model="claude-3-7-sonnet-20250219", max_retries=2)
+        self.calculation_model = self._anthropic # LLM for design calculations
+        # Document generation is templated rephrasing, not reasoning — the
+        # cheaper/faster Haiku tier is adequate for it, while Sonnet stays
+        # on the calculation and agent roles where quality matters
+        self.documentation_model = ChatAnthropic(model="claude-3-5-haiku-20241022", max_tokens=2048)
         # Model for the 3D modeling agent (passed when creating the agent)
-        self.modeling_llm = ChatAnthropic(model="claude-3-7-sonnet-20250219")
+        self.modeling_llm = self._anthropic
         #self.modeling_llm = ChatOpenAI(model="gpt-4.1")
 
+        # Cheap model for the rolling summary of old conversation turns;
+        # the summary text itself lives in the per-session ConversationState
+        self.summary_model = ChatAnthropic(model="claude-3-5-haiku-20241022")
+
 
     async def _initialize_modeling_agent_and_tools(self):
         """Initializes the MCP client and Langchain agent for 3D modeling asynchronously."""
@@ -91,13 +557,51 @@ class LangchainMCPApp:
                 }
             )
         )
-        tools = self.mcp_client.get_tools()
+        # Deterministic tool order keeps the serialized tool schemas — part
+        # of the cached prompt prefix — byte-stable across restarts
+        tools = sorted(self.mcp_client.get_tools(), key=lambda tool: tool.name)
+        self._tools = tools
+        self._tool_by_name = {tool.name: tool for tool in tools}
         self.modeling_agent = create_react_agent(self.modeling_llm, tools) # Use modeling_llm
         return "MCP Client and Modeling Agent initialized successfully."
 
+    async def _warm_up_modeling_agent(self) -> str:
+        """Best-effort early initialization of the modeling agent.
+
+        Run concurrently with the calculation step so MCP/FreeCAD startup
+        overlaps the first LLM round-trip. Errors are swallowed here and
+        surface later from the modeling step, which retries initialization.
+        """
+        try:
+            return await self.initialize_resources()
+        except Exception as e:
+            print(f"Deferred modeling agent initialization error: {e}")
+            return str(e)
+
+    async def _warm_up_llm_pool(self) -> None:
+        """Opens the HTTPS connection to the Anthropic API ahead of turn 1.
+
+        A one-token probe pays the TCP+TLS handshake during startup so the
+        first real calculation call reuses a warm keep-alive connection.
+        Best-effort: failures only mean turn 1 pays the handshake as before.
+        """
+        try:
+            await self._anthropic.ainvoke([HumanMessage(content="hi")], max_tokens=1)
+        except Exception as e:
+            print(f"LLM connection warmup failed (non-fatal): {e}")
+
     async def initialize_resources(self) -> str:
-        """Initializes resources asynchronously, mainly for the modeling agent."""
-        if not self.modeling_agent: # Initialize if the modeling agent is not already initialized
+        """Initializes resources asynchronously, mainly for the modeling agent.
+
+        Idempotent: a double-checked async lock ensures the MCP subprocesses
+        are spawned at most once even when warmup and the modeling step (or
+        multiple sessions) race into this method concurrently.
+        """
+        if self.modeling_agent: # Fast path without taking the lock
+            return "MCP Client and Modeling Agent are already initialized."
+        async with self._init_lock:
+            if self.modeling_agent: # Another caller initialized while we waited
+                return "MCP Client and Modeling Agent are already initialized."
             # Ensure this is awaited as it's an async function
             init_status = await self._initialize_modeling_agent_and_tools()
             # Check status more reliably
@@ -105,29 +609,225 @@ class LangchainMCPApp:
                  # Let the caller handle the error message display
                 raise RuntimeError(f"Failed to initialize modeling agent: {init_status}")
             return init_status
-        return "MCP Client and Modeling Agent are already initialized."
 
-    async def _run_calculation_step(self, user_query: str, history: List[Dict[str, Any]]) -> str:
-        """Step 1: Use the design calculation LLM to determine specifications."""
-        # Include history and current user request in the prompt
+    def _record_history(self, convo: ConversationState, history: List[Dict[str, Any]], upto: Union[int, None] = None) -> None:
+        """Folds new Gradio history entries into the session's SoA columns.
+
+        Incremental: only entries added since the previous call are scanned;
+        if the history shrank (chat cleared or rewritten) the columns are
+        rebuilt from scratch. Consecutive assistant messages within one
+        exchange (step updates) are merged into that exchange's slot.
+        `upto` bounds how far in the list counts as committed history, so
+        callers can pass a list they are still appending this turn's
+        in-progress messages to.
+        """
+        if upto is None:
+            upto = len(history)
+        if upto < convo.hist_converted_upto:
+            convo.user_msgs = []
+            convo.asst_msgs = []
+            convo.hist_converted_upto = 0
+        for item in history[convo.hist_converted_upto:upto]:
+            content = item.get("content")
+            if not content or not isinstance(content, str):
+                continue
+            if item["role"] == "user":
+                convo.user_msgs.append(content)
+                convo.asst_msgs.append("")
+            elif item["role"] == "assistant" and convo.asst_msgs:
+                if convo.asst_msgs[-1]:
+                    convo.asst_msgs[-1] += "\n\n" + content
+                else:
+                    convo.asst_msgs[-1] = content
+        convo.hist_converted_upto = upto
+
+    async def _update_history_summary(self, convo: ConversationState, older_history: List[Dict[str, Any]]) -> None:
+        """Maintains a session's rolling summary of turns that fell out of the window.
+
+        Uses the cheap summary model and only re-summarizes when new turns
+        have aged out since the last update. Failures are non-fatal: the
+        previous summary (possibly empty) keeps being used.
+        """
+        if len(older_history) <= convo.summarized_turns:
+            return
+        transcript = "\n".join(
+            f"{item['role']}: {item['content']}" for item in older_history if item.get("content")
+        )
+        prompt = HumanMessage(content=f"""Summarize the following design conversation concisely, preserving all concrete requirements, dimensions, and decisions. If an earlier summary is given, fold it in.
+
+Earlier summary:
+{convo.summary or '(none)'}
+
+Conversation:
+{transcript}
+
+Summary:""")
+        try:
+            async with self._llm_semaphore:
+                response = await self.summary_model.ainvoke([prompt])
+            convo.summary = response.content
+            convo.summarized_turns = len(older_history)
+        except Exception as e:
+            print(f"Error updating history summary (keeping previous summary): {e}")
+
+    async def _export_and_snapshot(self, doc_name: str, obj_name: str, export_file_name: str):
+        """Exports the object and takes a screenshot in one execute_code call.
+
+        Returns the parsed result dict (file_content_b64 / image_b64 /
+        error), or None when the tool is unavailable or the response could
+        not be parsed. One RPC replaces the separate export and screenshot
+        react iterations the agent used to perform.
+        """
+        execute_code_tool = self._tool_by_name.get("execute_code")
+        if execute_code_tool is None:
+            return None
+        code = (
+            f"DOC_NAME = {doc_name!r}\n"
+            f"OBJ_NAME = {obj_name!r}\n"
+            f"EXPORT_NAME = {export_file_name!r}\n"
+            + _EXPORT_SNAPSHOT_BODY
+        )
+        try:
+            response = await execute_code_tool.ainvoke({"code": code})
+            text = _message_text(getattr(response, "content", response))
+            result = _find_embedded_json(text, "file_content_b64")
+            if result is None:
+                print(f"Combined export/screenshot returned no JSON: {text[:200]}")
+            return result
+        except Exception as e:
+            print(f"Combined export/screenshot call failed: {e}")
+            return None
+
+    async def _ping(self) -> bool:
+        """Health check for the shared MCP transport.
+
+        Runs a trivial execute_code call so a dead FreeCAD subprocess is
+        detected before a full modeling run is attempted. Only a failed
+        ping justifies tearing down and respawning the subprocess.
+        """
+        if not self.mcp_client:
+            return False
+        try:
+            execute_code_tool = self._tool_by_name.get("execute_code")
+            if execute_code_tool is not None:
+                await execute_code_tool.ainvoke({"code": "print('ping')"})
+            return True # No execute_code tool; assume transport is fine
+        except Exception as e:
+            print(f"MCP health check failed: {e}")
+            return False
+
+    async def shutdown_resources(self) -> None:
+        """Closes the MCP client subprocesses and the exit stack."""
+        if self.exit_stack:
+            try:
+                await self.exit_stack.aclose()
+            except Exception as e:
+                print(f"Error closing exit_stack during shutdown: {e}")
+            self.exit_stack = None
+            self.mcp_client = None
+            self.modeling_agent = None
+            self._tools = []
+            self._tool_by_name = {}
+
+    async def _run_calculation_step(self, user_query: str, history: List[Dict[str, Any]], convo: ConversationState, prior_len: Union[int, None] = None):
+        """Step 1: Use the design calculation LLM to determine specifications.
+
+        Async generator: yields the accumulated response text as tokens
+        arrive from astream(), so the UI shows output at time-to-first-token
+        instead of waiting for the full completion. The last yielded value
+        is the complete specification text.
+        """
+        # Include recent history and the current user request in the prompt.
+        # Only the last HISTORY_WINDOW entries go in verbatim; older turns are
+        # represented by a rolling summary so the prompt stays O(window) in
+        # tokens rather than growing with every turn of the conversation.
+        # prior_len marks where last turn's history ends when the caller
+        # shares its live (still-growing) list with us
+        if prior_len is None:
+            prior_len = len(history)
+        if prior_len > HISTORY_WINDOW:
+            await self._update_history_summary(convo, history[:prior_len - HISTORY_WINDOW])
+
+        self._record_history(convo, history, prior_len)
+        window_pairs = HISTORY_WINDOW // 2
+
+        # Collapse summary + windowed exchanges into one deterministic
+        # transcript inside a cache_control-marked system block. Within a
+        # conversation the transcript grows append-only (until the window
+        # rolls), so Anthropic's prompt cache reuses the prefix across
+        # turns instead of re-billing shifting message boundaries.
+        transcript_parts = []
+        if convo.summary:
+            transcript_parts.append(f"Summary of the earlier part of this conversation:\n{convo.summary}")
+        for user_text, asst_text in zip(convo.user_msgs[-window_pairs:], convo.asst_msgs[-window_pairs:]):
+            transcript_parts.append(f"User: {user_text}")
+            if asst_text: # Also include past AI responses in the context
+                transcript_parts.append(f"Assistant: {asst_text}")
+
         prompt_messages = []
-        for item in history:
-            if item["role"] == "user" and item["content"]:
-                prompt_messages.append(HumanMessage(content=item["content"]))
-            elif item["role"] == "assistant" and item["content"]: # Also include past AI responses in the context
-                prompt_messages.append(AIMessage(content=item["content"]))
+        if transcript_parts:
+            prompt_messages.append(SystemMessage(content=[{
+                "type": "text",
+                "text": "Conversation so far:\n\n" + "\n\n".join(transcript_parts),
+                "cache_control": {"type": "ephemeral"},
+            }]))
 
         prompt_messages.append(HumanMessage(content=f"User\'s request: '{user_query}'\n\nBased on the above request, calculate the necessary mechanical specifications and determine the detailed specifications. Please describe them clearly in bullet points."))
 
         try:
-            response = await self.calculation_model.ainvoke(prompt_messages)
-            return response.content
+            async with self._llm_semaphore:
+                chunks = []
+                async for chunk in self.calculation_model.astream(prompt_messages):
+                    if chunk.content:
+                        chunks.append(chunk.content)
+                        yield "".join(chunks)
+            if not chunks:
+                yield ""
         except Exception as e:
             print(f"Error in calculation step: {e}")
-            return f"An error occurred during design calculation: {str(e)}"
+            yield f"An error occurred during design calculation: {str(e)}"
+
+    async def run_batch_async(self, queries: List[str], histories: Union[List[List[Dict[str, str]]], None] = None) -> List[str]:
+        """Runs several independent calculation prompts as one batched call.
+
+        Builds one prompt list per query and hands them all to abatch(),
+        which fans them out over the shared client with bounded concurrency —
+        per-request overhead is amortized instead of paid serially per turn.
+        """
+        if histories is None:
+            histories = [[] for _ in queries]
+        prompts = []
+        for query, history in zip(queries, histories):
+            msgs: List[Union[HumanMessage, AIMessage]] = []
+            for item in history:
+                if item["role"] == "user" and item["content"]:
+                    msgs.append(HumanMessage(content=item["content"]))
+                elif item["role"] == "assistant" and item["content"]:
+                    msgs.append(AIMessage(content=item["content"]))
+            msgs.append(HumanMessage(content=f"User\'s request: '{query}'\n\nBased on the above request, calculate the necessary mechanical specifications and determine the detailed specifications. Please describe them clearly in bullet points."))
+            prompts.append(msgs)
+        try:
+            responses = await self._anthropic.abatch(prompts, config={"max_concurrency": 8})
+            return [response.content for response in responses]
+        except Exception as e:
+            print(f"Error in batch calculation step: {e}")
+            return [f"An error occurred during design calculation: {str(e)}"] * len(queries)
 
     async def _extract_modeling_parameters(self, calculation_output: str) -> str:
-        """Extracts parameters relevant for 3D modeling from the calculation output."""
+        """Extracts parameters relevant for 3D modeling from the calculation output.
+
+        Short outputs that already carry plenty of dimension tokens are
+        passed through unchanged — the filter call would only re-emit them
+        at the cost of a full LLM round-trip.
+        """
+        if len(calculation_output) < 1500 and len(_DIMENSION_RE.findall(calculation_output)) >= 5:
+            return calculation_output
+
+        cache_key = hashlib.md5(" ".join(calculation_output.split()).encode("utf-8")).hexdigest()
+        cached = self._extract_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         prompt_message = HumanMessage(
             content=f"""The following text contains detailed design specifications.
 Please extract ONLY the information essential for 3D modeling, such as dimensions, shape descriptions, key components, and their spatial relationships.
@@ -141,7 +841,11 @@ Essential 3D Modeling Parameters:
 """
         )
         try:
-            response = await self.calculation_model.ainvoke([prompt_message])
+            async with self._llm_semaphore:
+                response = await self.calculation_model.ainvoke([prompt_message])
+            if len(self._extract_cache) >= 64:
+                self._extract_cache.pop(next(iter(self._extract_cache)))
+            self._extract_cache[cache_key] = response.content
             return response.content
         except Exception as e:
             print(f"Error in modeling parameter extraction step: {e}")
@@ -149,106 +853,136 @@ Essential 3D Modeling Parameters:
 
     async def _run_modeling_step(self, specifications: str, doc_name: str = "MyDesignDoc", obj_name:str = "MyExportedObject", screenshot_filename: str = "") -> Dict[str, Union[str, None]]:
         """Step 2: Use the 3D model LLM (agent) to generate a 3D model and export it."""
-        # Return a dictionary: {"image_data": base64_string or None, "model_file_path": path_string or None, "error": error_message_string or None}
+        # Return a dictionary: {"image_path": png_path_string or None, "model_file_path": path_string or None, "error": error_message_string or None}
 
         if not self.modeling_agent:
             try:
                 await self.initialize_resources()
             except RuntimeError as e:
-                return {"image_data": None, "model_file_path": None, "error": str(e)}
+                return {"image_path": None, "model_file_path": None, "error": str(e)}
+        elif not await self._ping():
+            # Reconnect only when the health check says the transport died;
+            # the steady-state path never pays the subprocess respawn
+            print("MCP transport unhealthy; reinitializing modeling agent...")
+            await self.shutdown_resources()
+            try:
+                await self.initialize_resources()
+            except RuntimeError as e:
+                return {"image_path": None, "model_file_path": None, "error": str(e)}
 
         # Define a default filename and format, can be made more dynamic
         export_file_name = f"{obj_name}.step"
         export_format = "STEP"
 
-        prompt = f"""
-First, create a 3D model based on the following specifications in the document named '{doc_name}'.
-Make sure the primary object you create or modify is named '{obj_name}'.
+        # Stable instructions go in a cache_control-marked system block so
+        # only the short variable part below is re-billed per react step
+        preamble = SystemMessage(content=[{
+            "type": "text",
+            "text": _MODELING_PREAMBLE,
+            "cache_control": {"type": "ephemeral"},
+        }])
+        task = HumanMessage(content=f"""Document name: '{doc_name}'
+Primary object name: '{obj_name}'
+
 Specifications:
 {specifications}
-
-After successfully creating or verifying the object '{obj_name}' in document '{doc_name}',
-use the 'export_object_as_file' tool to export the object '{obj_name}' from document '{doc_name}'.
-Use the filename '{export_file_name}' and format '{export_format}'.
-The final output should include any image of the generated model (data:image/png;base64 format) AND the result from the export tool.
-If the export tool returns a JSON with 'file_content_b64', ensure that JSON string is part of your final response.
-"""
+""")
         try:
-            agent_input = {"messages": [HumanMessage(content=prompt)]}
-            agent_response_dict = await self.modeling_agent.ainvoke(agent_input)
+            agent_input = {"messages": [preamble, task]}
 
+            # Stream the react loop instead of awaiting the full transcript:
+            # the export tool's structured output is captured directly from
+            # its on_tool_end event, and only the final AI message text is
+            # kept around for image/status parsing — the intermediate tool
+            # chatter never accumulates in one giant string.
             agent_response_content = ""
-            if isinstance(agent_response_dict, dict) and "messages" in agent_response_dict:
-                ai_messages = [msg for msg in agent_response_dict["messages"] if isinstance(msg, AIMessage)]
-                if ai_messages:
-                    agent_response_content = ai_messages[-1].content
-                else: # Should not happen with react agent, but handle defensively
-                    agent_response_content = str(agent_response_dict)
-            else: # Fallback if response structure is unexpected
-                agent_response_content = str(agent_response_dict)
-
-            print(agent_response_content)
-
-            image_data_b64 = None
+            export_tool_text = None
+            async for event in self.modeling_agent.astream_events(agent_input, version="v2"):
+                kind = event["event"]
+                if kind == "on_tool_end" and event.get("name") == "export_object_as_file" and export_tool_text is None:
+                    output = event.get("data", {}).get("output")
+                    export_tool_text = _message_text(getattr(output, "content", output))
+                elif kind == "on_chat_model_end":
+                    output = event.get("data", {}).get("output")
+                    text = _message_text(getattr(output, "content", None))
+                    if text:
+                        agent_response_content = text
+
+            print(agent_response_content[:2000])
+
+            image_path = None
             model_file_path = None
             error_message = None # This will hold the primary status/error message for the normal flow
             screenshot_file_path = None # Initialize screenshot_file_path
 
+            # One combined export+screenshot RPC now that the agent only
+            # builds the model; both blobs come back in a single JSON
+            combined = await self._export_and_snapshot(doc_name, obj_name, export_file_name)
+            if combined:
+                if combined.get("file_content_b64"):
+                    exported_filename = combined.get("file_name") or export_file_name
+                    model_file_path = _artifact_path(exported_filename)
+                    await asyncio.to_thread(_write_b64_to_file, combined["file_content_b64"], model_file_path)
+                    print(f"Model exported and saved to: {model_file_path}")
+                if combined.get("image_b64"):
+                    if screenshot_filename:
+                        screenshot_file_path = _artifact_path(screenshot_filename)
+                        image_path = screenshot_file_path
+                    else:
+                        fd, image_path = tempfile.mkstemp(suffix=".png", prefix="model_preview_")
+                        os.close(fd)
+                    await asyncio.to_thread(_write_b64_to_file, combined["image_b64"], image_path)
+                    print(f"Model image saved to: {image_path}")
+                if combined.get("error") and not combined.get("file_content_b64"):
+                    print(f"Combined export/screenshot reported: {combined['error']}")
+
             # Check for recursion limit message in the agent's textual response
             is_recursion_error_in_agent_text = "Recursion limit" in agent_response_content and "GRAPH_RECURSION_LIMIT" in agent_response_content
             if is_recursion_error_in_agent_text:
                 print("DEBUG: Recursion limit message detected in agent's textual response.")
 
-            # Extract image data
-            image_match = re.search(r'(data:image/png;base64,[A-Za-z0-9+/=]+)', agent_response_content)
-            if image_match:
-                image_data_b64 = image_match.group(1)
-                # Save the screenshot if image_data_b64 is found and screenshot_filename is provided
-                if image_data_b64 and screenshot_filename:
-                    try:
-                        # Ensure the 'model_exports' directory exists
-                        exports_dir = "model_exports"
-                        if not os.path.exists(exports_dir):
-                            os.makedirs(exports_dir)
-                        
-                        screenshot_file_path = os.path.join(exports_dir, screenshot_filename)
-                        # Remove the "data:image/png;base64," prefix before decoding
-                        img_data_to_decode = image_data_b64.split(',')[1]
-                        # Base64 文字列の長さが 4 の倍数でない場合は '=' を補完
-                        missing_padding = len(img_data_to_decode) % 4
-                        if missing_padding:
-                            img_data_to_decode += '=' * (4 - missing_padding)
-                        with open(screenshot_file_path, "wb") as f:
-                            f.write(base64.b64decode(img_data_to_decode))
-                        print(f"Screenshot saved to: {screenshot_file_path}")
-                    except Exception as e:
-                        print(f"Error saving screenshot: {e}")
-                        # Optionally, set an error message or handle this error
-                        # For now, we just print and continue, screenshot_file_path will remain None or its previous value
+            # Extract image data: decode the base64 payload once to bytes and
+            # hand a PNG file path downstream, so the multi-MB string is not
+            # re-copied through HTML embeds and history joins
+            img_data_to_decode = None if image_path else _find_b64_image(agent_response_content)
+            if img_data_to_decode:
+                try:
+                    # Base64 文字列の長さが 4 の倍数でない場合は '=' を補完
+                    missing_padding = len(img_data_to_decode) % 4
+                    if missing_padding:
+                        img_data_to_decode += '=' * (4 - missing_padding)
+
+                    if screenshot_filename:
+                        screenshot_file_path = _artifact_path(screenshot_filename)
+                        image_path = screenshot_file_path
+                    else:
+                        fd, image_path = tempfile.mkstemp(suffix=".png", prefix="model_preview_")
+                        os.close(fd)
+                    # Decode + write off the event loop so concurrent LLM/MCP
+                    # tasks keep progressing during multi-MB saves
+                    await asyncio.to_thread(_write_b64_to_file, img_data_to_decode, image_path)
+                    print(f"Model image saved to: {image_path}")
+                except Exception as e:
+                    print(f"Error saving model image: {e}")
+                    # We just print and continue; image_path/screenshot_file_path stay None
 
             # Extract exported file data
             # Relax the pattern so that as long as the JSON contains the key "file_content_b64" we treat it as export data.
             # This prevents missing the export when the agent omits optional keys (e.g., "message").
-            export_data_match = re.search(r'\{[^{}]*"file_content_b64"[^{}]*\}', agent_response_content, re.DOTALL)
+            # Prefer the export tool's own output (small, seen mid-stream);
+            # fall back to scanning the final message only if it was missed
+            export_source = export_tool_text if export_tool_text is not None else agent_response_content
+            export_data = None if model_file_path else _find_embedded_json(export_source, "file_content_b64")
 
-            if export_data_match:
+            if export_data is not None:
                 try:
-                    export_json_str = export_data_match.group(0)
-                    export_data = json.loads(export_json_str)
                     if export_data.get("file_content_b64"):
                         file_content_b64 = export_data["file_content_b64"]
-                        # Save the decoded file content
-                        # Ensure the 'exports' directory exists
-                        exports_dir = "model_exports"
-                        if not os.path.exists(exports_dir):
-                            os.makedirs(exports_dir)
-                        
                         # Use the filename from the export tool's response
                         exported_filename = export_data.get("file_name", export_file_name) # Fallback to original name
-                        model_file_path = os.path.join(exports_dir, exported_filename)
-                        
-                        with open(model_file_path, "wb") as f:
-                            f.write(base64.b64decode(file_content_b64))
+                        model_file_path = _artifact_path(exported_filename)
+
+                        await asyncio.to_thread(_write_b64_to_file, file_content_b64, model_file_path)
                         print(f"Model exported and saved to: {model_file_path}")
                     elif export_data.get("error"):
                         # This error_message might be overridden if is_recursion_error_in_agent_text is true
@@ -258,37 +992,33 @@ If the export tool returns a JSON with 'file_content_b64', ensure that JSON stri
                         # This error_message might be overridden if is_recursion_error_in_agent_text is true
                         error_message = "Export tool ran, but no file content or error found in its JSON response."
                         print(error_message)
-                except json.JSONDecodeError as e:
-                    # This error_message might be overridden if is_recursion_error_in_agent_text is true
-                    error_message = f"Failed to parse export data JSON: {str(e)}. Raw: {export_json_str}"
-                    print(error_message)
                 except Exception as e:
                     # This error_message might be overridden if is_recursion_error_in_agent_text is true
                     error_message = f"Error processing exported file data: {str(e)}"
                     print(error_message)
-            # No explicit "else" for export_data_match here, message construction below handles cases
+            # No explicit "else" for export_data here, message construction below handles cases
 
             # Final message construction
             if is_recursion_error_in_agent_text:
                 current_status_message = "Step 2 finished. Model generation may be partially complete due to recursion limit in agent response."
                 if screenshot_file_path:
                     current_status_message += f" Screenshot saved as '{os.path.basename(screenshot_file_path)}'."
-                elif image_data_b64:
+                elif image_path:
                     current_status_message += " A model preview was generated."
                 else:
                     current_status_message += " No screenshot or preview was generated."
                 error_message = current_status_message # Override any previous error_message from export tool if recursion was detected
-            elif not error_message and not model_file_path and not image_data_b64:
+            elif not error_message and not model_file_path and not image_path:
                 # If no specific error from export, no model, and no image, then set a generic "no output" message
                 error_message = "Modeling agent did not return image or export data."
             # If error_message was set due to an export issue (and no recursion error in text), it will be preserved.
 
-            return {"image_data": image_data_b64, "model_file_path": model_file_path, "error": error_message, "screenshot_file_path": screenshot_file_path}
+            return {"image_path": image_path, "model_file_path": model_file_path, "error": error_message, "screenshot_file_path": screenshot_file_path}
 
         except Exception as e:
             print(f"Error in modeling step: {e}")
             # Initialize error result, including a key for a potential fallback screenshot
-            error_result = {"image_data": None, "model_file_path": None, "error": f"An error occurred during 3D modeling: {str(e)}", "screenshot_file_path": None, "fallback_screenshot_path": None}
+            error_result = {"image_path": None, "model_file_path": None, "error": f"An error occurred during 3D modeling: {str(e)}", "screenshot_file_path": None, "fallback_screenshot_path": None}
             
             is_recursion_exception = "Recursion limit" in str(e) and "GRAPH_RECURSION_LIMIT" in str(e)
 
@@ -301,69 +1031,14 @@ If the export tool returns a JSON with 'file_content_b64', ensure that JSON stri
                 try:
                     print("Attempting to take a fallback screenshot due to modeling error...")
                     
-                    # Try to get FreeCAD status using execute_code
-                    execute_code_tool = None
-                    # get_view_tool = None # Keep this for later # Not used in current fallback
-                    available_tools = self.mcp_client.get_tools()
-                    for tool_obj in available_tools:
-                        if tool_obj.name == "execute_code":
-                            execute_code_tool = tool_obj
-                            break # Found execute_code, no need to search for get_view for this path
-                    
+                    # O(1) lookup in the cached tool map instead of
+                    # rebuilding the tool list per failure
+                    execute_code_tool = self._tool_by_name.get("execute_code")
+
                     if execute_code_tool:
                         print("Attempting fallback screenshot directly via execute_code...")
-                        # Code inspired by FreeCADConnection.get_active_screenshot and export_object
-                        screenshot_code = '''
-import FreeCAD
-import FreeCADGui
-import base64
-import os
-import tempfile
-
-img_b64 = None
-error_msg = None
-try:
-    if FreeCAD.Gui.ActiveDocument and FreeCAD.Gui.ActiveDocument.ActiveView:
-        view = FreeCAD.Gui.ActiveDocument.ActiveView
-        view_type = type(view).__name__
-        unsupported_views = ['SpreadsheetGui::SheetView', 'DrawingGui::DrawingView', 'TechDrawGui::MDIViewPage']
-        
-        if view_type in unsupported_views or not hasattr(view, 'saveImage'):
-            error_msg = f"Current view ({view_type}) does not support screenshots."
-        else:
-            # Create a temporary file to save the image
-            fd, temp_image_path = tempfile.mkstemp(suffix='.png', prefix='freecad_ss_')
-            os.close(fd) # We only need the path
-            try:
-                view.saveImage(temp_image_path, 1920, 1080, 'White') # Example resolution and background
-                if os.path.exists(temp_image_path) and os.path.getsize(temp_image_path) > 0:
-                    with open(temp_image_path, 'rb') as f:
-                        img_b64 = base64.b64encode(f.read()).decode('utf-8')
-                else:
-                    error_msg = "saveImage executed but file not created or empty."
-            except Exception as e_save:
-                error_msg = f"Error during view.saveImage: {str(e_save)}"
-            finally:
-                if os.path.exists(temp_image_path):
-                    try:
-                        os.remove(temp_image_path)
-                    except Exception as e_clean:
-                        print(f"Warning: Failed to remove temp_image_path {temp_image_path}: {str(e_clean)}") # Print on FreeCAD side
-    elif not FreeCAD.ActiveDocument:
-        error_msg = "No active document in FreeCAD to take screenshot from."
-    else: # ActiveDocument exists, but no ActiveView
-        error_msg = "No active view in FreeCADGui to take screenshot from."
-except Exception as e_outer:
-    error_msg = f"Outer error during screenshot script: {str(e_outer)}"
-
-if img_b64:
-    print(f"data:image/png;base64,{img_b64}") # Output base64 string directly
-else:
-    print(f"Error: {{error_msg}}") # Output error message
-'''
                         try:
-                            screenshot_response_list = await execute_code_tool.ainvoke({"code": screenshot_code})
-                            fallback_image_data_b64 = None
+                            screenshot_response_list = await execute_code_tool.ainvoke({"code": _FALLBACK_SS_CODE})
                             response_text = ""
                             if isinstance(screenshot_response_list, list) and screenshot_response_list:
                                 # Expecting list[TextContent]
@@ -378,33 +1053,22 @@ else:
                             print(f"Response from execute_code for screenshot: {response_text}")
 
                             # Extract data:image/png;base64 string if present
-                            match_b64 = re.search(r'data:image/png;base64,[A-Za-z0-9+/=]+', response_text)
-                            if match_b64:
-                                fallback_image_data_b64 = match_b64.group(0)
-                            elif response_text.strip().startswith("Error:"):
-                                print(f"execute_code for screenshot reported error: {response_text.strip()}")
-                            else:
-                                print("execute_code for screenshot did not include base64 image data.")
+                            fallback_image_data_b64 = _find_b64_image(response_text)
+                            if not fallback_image_data_b64:
+                                if response_text.strip().startswith("Error:"):
+                                    print(f"execute_code for screenshot reported error: {response_text.strip()}")
+                                else:
+                                    print("execute_code for screenshot did not include base64 image data.")
 
                             # Proceed with saving if fallback_image_data_b64 was obtained
                             if fallback_image_data_b64:
-                                exports_dir = "model_exports"
-                                if not os.path.exists(exports_dir):
-                                    os.makedirs(exports_dir)
-                                
                                 import datetime
                                 timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                                fallback_filename = f"fallback_direct_ss_{timestamp}.png"
-                                fallback_save_path = os.path.join(exports_dir, fallback_filename)
-                                
-                                img_data_to_decode = fallback_image_data_b64.split(',')[1]  # Remove data:image/png;base64, prefix
-                                # Base64 文字列の長さが 4 の倍数でない場合は '=' を補完
-                                missing_padding = len(img_data_to_decode) % 4
-                                if missing_padding:
-                                    img_data_to_decode += '=' * (4 - missing_padding)
-                                
-                                with open(fallback_save_path, "wb") as f:
-                                    f.write(base64.b64decode(img_data_to_decode))
+                                fallback_filename = f"fallback_direct_ss_{timestamp}.jpg"
+                                fallback_save_path = _artifact_path(fallback_filename)
+
+                                # Prefix-free payload; _write_b64_to_file re-pads if needed
+                                await asyncio.to_thread(_write_b64_to_file, fallback_image_data_b64, fallback_save_path)
                                 print(f"Fallback screenshot directly saved to: {fallback_save_path}")
                                 error_result["fallback_screenshot_path"] = fallback_save_path
 
@@ -426,67 +1090,100 @@ else:
                 
             return error_result
 
-    async def _run_documentation_step(self, user_query: str, calculation_output: str, modeling_step_output: Dict[str, Union[str, None]]) -> str:
-        """Step 3: Use the final output LLM to generate documentation."""
-        
-        model_summary_for_doc = "3D model was not generated or encountered an error."
-        if modeling_step_output:
-            if modeling_step_output.get("model_file_path"):
-                model_file_name = os.path.basename(modeling_step_output["model_file_path"])
-                model_summary_for_doc = f"3D model generated and exported as '{model_file_name}'. "
-                if modeling_step_output.get("image_data"):
-                    model_summary_for_doc += "A preview is available in the chat."
-                else:
-                    model_summary_for_doc += "No preview image was generated."
-            elif modeling_step_output.get("image_data"): # Only image, no file
-                 model_summary_for_doc = "3D model preview generated. File export may have failed or was not performed."
-            elif modeling_step_output.get("error"):
-                model_summary_for_doc = f"3D modeling/export failed: {modeling_step_output['error']}"
-
-            if modeling_step_output and modeling_step_output.get("screenshot_file_path"):
-                screenshot_basename = os.path.basename(modeling_step_output["screenshot_file_path"])
-                model_summary_for_doc += f" A screenshot '{screenshot_basename}' was also saved."
-
-            if modeling_step_output and modeling_step_output.get("fallback_screenshot_path"):
-                fallback_basename = os.path.basename(modeling_step_output["fallback_screenshot_path"])
-                model_summary_for_doc += f" Due to a modeling error, a fallback screenshot '{fallback_basename}' was also captured and saved."
-
+    async def _run_documentation_base(self, user_query: str, calculation_output: str) -> str:
+        """Step 3a: Generate the proposal body, minus the modeling status.
 
-        prompt = f"""Based on the following information, create a design proposal document for the user.
-Assume it will be saved in Markdown format as 'proposal.md'.
-
-Original user request:
-{user_query}
-
-Design calculation results and specifications:
-{calculation_output}
-
-Summary of 3D modeling and export results:
-{model_summary_for_doc}
-
-The document should include the following elements:
-1.  Summary of user request
-2.  Proposed specifications (mechanical specs, etc.)
-3.  Design points and rationale
-4.  Information about the 3D model (e.g., filename if exported, or status if not)
-5.  Next steps or recommendations (if any)
-"""
+        Runs concurrently with the modeling step — it only needs the
+        calculation specs — so the documentation LLM round-trip hides
+        behind the FreeCAD agent instead of adding to it. Section 4 comes
+        back as a placeholder that _finalize_documentation fills in.
+        """
+        payload = json.dumps({
+            "user_request": user_query,
+            "calculation_specifications": calculation_output,
+        }, ensure_ascii=False, indent=2)
+
+        # Fixed instructions live in a cache_control-marked system block so
+        # the prefix is served from the prompt cache; only the JSON payload
+        # below varies per run
+        system = SystemMessage(content=[{
+            "type": "text",
+            "text": _DOCUMENTATION_SYSTEM,
+            "cache_control": {"type": "ephemeral"},
+        }])
         try:
-            response = await self.documentation_model.ainvoke([HumanMessage(content=prompt)])
-            return response.content
+            async with self._llm_semaphore:
+                chunks = []
+                async for chunk in self.documentation_model.astream([system, HumanMessage(content=payload)]):
+                    if chunk.content:
+                        chunks.append(chunk.content)
+            return "".join(chunks)
         except Exception as e:
             print(f"Error in documentation step: {e}")
             return f"An error occurred during document generation: {str(e)}"
 
+    def _finalize_documentation(self, base_md: str, modeling_step_output: Dict[str, Union[str, None]]) -> str:
+        """Step 3b: Substitute the real modeling status into the proposal.
+
+        Pure string work — no LLM call — so finalization is effectively
+        free once both concurrent steps have finished.
+        """
+        modeling_step_output = modeling_step_output or {}
+        if modeling_step_output.get("model_file_path"):
+            model_file_name = os.path.basename(modeling_step_output["model_file_path"])
+            status = f"3D model generated and exported as '{model_file_name}'."
+            if modeling_step_output.get("image_path"):
+                status += " A preview is available in the chat."
+        elif modeling_step_output.get("image_path"):
+            status = "3D model preview generated. File export may have failed or was not performed."
+        elif modeling_step_output.get("error"):
+            status = f"3D modeling/export failed: {modeling_step_output['error']}"
+        else:
+            status = "3D model was not generated."
+
+        if modeling_step_output.get("screenshot_file_path"):
+            screenshot_basename = os.path.basename(modeling_step_output["screenshot_file_path"])
+            status += f" A screenshot '{screenshot_basename}' was also saved."
+        if modeling_step_output.get("fallback_screenshot_path"):
+            fallback_basename = os.path.basename(modeling_step_output["fallback_screenshot_path"])
+            status += f" Due to a modeling error, a fallback screenshot '{fallback_basename}' was also captured and saved."
+
+        if _MODEL_STATUS_PLACEHOLDER in base_md:
+            return base_md.replace(_MODEL_STATUS_PLACEHOLDER, status)
+        # Model ignored the placeholder instruction; append rather than lose
+        # the status entirely
+        return f"{base_md}\n\n## 3D model status\n\n{status}\n"
+
     async def _execute_post_calculation(self, user_query: str, history: List[Dict[str, str]], calculation_specifications: str):
         """Executes the remaining flow (parameter extraction, modeling, documentation) after calculation is done.
-        Returns flow_responses, proposal_md, model_file_path, screenshot_file_path
+
+        Async generator: yields ("message", chat_message_dict) as each stage
+        produces output, so the UI can render progress while later LLM calls
+        are still in flight, and finally yields
+        ("result", (proposal_md, model_file_path, screenshot_file_path)).
         """
-        # Step 1.5: Extract modeling parameters
-        modeling_parameters = await self._extract_modeling_parameters(calculation_specifications)
+        # Execution cache: an identical query (after trim + lowercase)
+        # that already completed replays its proposal and artifacts
+        # without re-running extraction, modeling, or documentation
+        cache_key = _execution_cache_key(user_query)
+        cached = _load_cached_execution(cache_key)
+        if cached is not None:
+            yield ("message", {"role": "assistant", "content": "**Steps 2-3: Reusing Cached Result**\nThis request matches a previous run; returning the stored model and proposal."})
+            if cached.get("screenshot_file_path"):
+                yield ("message", {"role": "assistant", "content": {"path": cached["screenshot_file_path"], "alt_text": "generated 3d model screenshot"}})
+            yield ("result", (cached.get("proposal_md", ""), cached.get("model_file_path"), cached.get("screenshot_file_path")))
+            return
+
+        # Step 1.5: Extract modeling parameters, overlapped with modeling
+        # agent initialization — the extraction LLM round-trip and any
+        # remaining MCP/FreeCAD startup run concurrently. The extraction
+        # depends on the calculation output, so it cannot start earlier.
+        modeling_parameters, _init_status = await asyncio.gather(
+            self._extract_modeling_parameters(calculation_specifications),
+            self._warm_up_modeling_agent(),
+        )
 
-        # Initialize containers for later messages and files (available regardless of extraction success)
-        flow_responses: List[Dict[str, str]] = []
+        # Initialize containers for files (available regardless of extraction success)
         modeling_result_data = None
         model_file_for_gradio = None
         screenshot_file_for_gradio = None
@@ -499,8 +1196,22 @@ The document should include the following elements:
             parameters_for_modeling_step = modeling_parameters
             print("""Successfully extracted modeling parameters (post-calculation step).""")
 
+        # Step 3a starts now, concurrent with Step 2: the proposal body
+        # only needs the calculation specs, so the documentation LLM runs
+        # while FreeCAD builds the model — end-to-end latency becomes
+        # max(modeling, documentation) instead of their sum. Skipped when
+        # the calculation already failed (templated error report instead).
+        doc_task = None
+        if not calculation_specifications.startswith(_ERR_PREFIXES):
+            doc_task = asyncio.create_task(
+                self._run_documentation_base(user_query, calculation_specifications))
+
         try:
             await self.initialize_resources()
+            # Sub-step event: parameters are extracted and FreeCAD is up,
+            # geometry construction is about to start — rendered while the
+            # agent iterates so the user is not staring at a static string
+            yield ("message", {"role": "assistant", "content": "**Step 2: Building Geometry...**\nModeling parameters extracted; the FreeCAD agent is constructing the model."})
             doc_name_for_modeling = "DesignDocument"
             object_name_for_modeling = "MainAssembly"
             screenshot_filename = f"{object_name_for_modeling}_preview.png"
@@ -514,7 +1225,7 @@ The document should include the following elements:
 
             if modeling_result_data.get("error"):
                 # エラーメッセージをまず追加
-                flow_responses.append({
+                yield ("message", {
                     "role": "assistant",
                     "content": f"**Step 2: 3D Modeling & Export Error**\n```\n{modeling_result_data['error']}\n```"
                 })
@@ -522,85 +1233,96 @@ The document should include the following elements:
                 # エラー時でも fallback_screenshot_path があれば処理する
                 if modeling_result_data.get("fallback_screenshot_path"):
                     fallback_screenshot_file_for_gradio = modeling_result_data["fallback_screenshot_path"]
-                    img_html_fallback = f'<img src="file={fallback_screenshot_file_for_gradio}" alt="Fallback screenshot due to error" />'
-                    flow_responses.append({
+                    yield ("message", {
                         "role": "assistant",
-                        "content": f"**Step 2: Fallback Screenshot (due to modeling error)**\n{img_html_fallback}"
+                        "content": "**Step 2: Fallback Screenshot (due to modeling error)**"
+                    })
+                    yield ("message", {
+                        "role": "assistant",
+                        "content": {"path": fallback_screenshot_file_for_gradio, "alt_text": "Fallback screenshot due to error"}
                     })
                     # メインの screenshot 変数が未設定ならここで設定
                     if not screenshot_file_for_gradio:
                         screenshot_file_for_gradio = fallback_screenshot_file_for_gradio
             else:
-                if modeling_result_data.get("image_data") and not modeling_result_data.get("screenshot_file_path"):
-                    img_html = f'<img src="{modeling_result_data["image_data"]}" alt="generated 3d model" />'
-                    flow_responses.append({"role": "assistant", "content": f"**Step 2: 3D Model Preview (not saved as file)**\n{img_html}"})
+                if modeling_result_data.get("image_path") and not modeling_result_data.get("screenshot_file_path"):
+                    yield ("message", {"role": "assistant", "content": "**Step 2: 3D Model Preview**"})
+                    yield ("message", {"role": "assistant", "content": {"path": modeling_result_data["image_path"], "alt_text": "generated 3d model"}})
 
                 if modeling_result_data.get("model_file_path"):
                     model_file_for_gradio = modeling_result_data["model_file_path"]
-                    flow_responses.append({"role": "assistant", "content": f"**Step 2: Model Export Successful**\nModel exported to: {os.path.basename(model_file_for_gradio)}."})
+                    yield ("message", {"role": "assistant", "content": f"**Step 2: Model Export Successful**\nModel exported to: {os.path.basename(model_file_for_gradio)}."})
 
                 if modeling_result_data.get("screenshot_file_path"):
                     screenshot_file_for_gradio = modeling_result_data["screenshot_file_path"]
-                    img_html_from_file = f'<img src="file={screenshot_file_for_gradio}" alt="generated 3d model screenshot" />'
-                    flow_responses.append({"role": "assistant", "content": f"**Step 2: Screenshot Saved**\nScreenshot saved as: {os.path.basename(screenshot_file_for_gradio)}."})
+                    yield ("message", {"role": "assistant", "content": f"**Step 2: Screenshot Saved**\nScreenshot saved as: {os.path.basename(screenshot_file_for_gradio)}."})
+                    yield ("message", {"role": "assistant", "content": {"path": screenshot_file_for_gradio, "alt_text": "generated 3d model screenshot"}})
 
-                if not modeling_result_data.get("image_data") and not modeling_result_data.get("model_file_path") and not modeling_result_data.get("screenshot_file_path"):
-                    flow_responses.append({"role": "assistant", "content": "**Step 2: 3D Modeling & Export Result**\nNo specific output or error reported by the modeling step."})
+                if not any(modeling_result_data.get(k) for k in _MODELING_OUTPUT_KEYS):
+                    yield ("message", {"role": "assistant", "content": "**Step 2: 3D Modeling & Export Result**\nNo specific output or error reported by the modeling step."})
         except RuntimeError as e:
-            flow_responses.append({"role": "assistant", "content": f"**Step 2: 3D Modeling & Export Skipped**\nFailed to initialize modeling agent: {e}"})
+            yield ("message", {"role": "assistant", "content": f"**Step 2: 3D Modeling & Export Skipped**\nFailed to initialize modeling agent: {e}"})
             modeling_result_data = {"error": str(e)}
         except Exception as e:
-            flow_responses.append({"role": "assistant", "content": f"**Step 2: 3D Modeling & Export Failed**\nUnexpected error: {e}"})
+            yield ("message", {"role": "assistant", "content": f"**Step 2: 3D Modeling & Export Failed**\nUnexpected error: {e}"})
             modeling_result_data = {"error": str(e)}
 
-        # Step 3: Document generation
-        flow_responses.append({"role": "assistant", "content": "**Step 3: Document Generation in Progress...**"})
-        proposal_md = await self._run_documentation_step(user_query, calculation_specifications, modeling_result_data)
-        flow_responses.append({"role": "assistant", "content": f"**Step 3: Document Generation Complete**\nProposal document is ready."})
+        # Step 3: Document finalization. The proposal body has been
+        # generating since before the modeling step started; here the
+        # placeholder section 4 is filled in with the real modeling status.
+        # If the calculation itself failed, no doc task was launched and a
+        # templated error report is rendered instead of an LLM round-trip.
+        modeling_error = (modeling_result_data or {}).get("error") or ""
+        if doc_task is None:
+            proposal_md = _render_error_proposal(user_query, calculation_specifications, modeling_error)
+            yield ("message", {"role": "assistant", "content": "**Step 3: Document Generation Skipped**\nAn earlier step failed; a minimal error report was generated instead."})
+        else:
+            yield ("message", {"role": "assistant", "content": "**Step 3: Finalizing Proposal Document...**"})
+            base_md = await doc_task
+            proposal_md = self._finalize_documentation(base_md, modeling_result_data)
+            yield ("replace", {"role": "assistant", "content": f"**Step 3: Document Generation Complete**\n\n{proposal_md}"})
+
+        # Only fully successful runs are cached; error proposals must not
+        # mask a transient failure on retry
+        if not modeling_error and not calculation_specifications.startswith(_ERR_PREFIXES):
+            await asyncio.to_thread(_store_cached_execution, cache_key, {
+                "proposal_md": proposal_md,
+                "model_file_path": model_file_for_gradio,
+                "screenshot_file_path": screenshot_file_for_gradio,
+            })
 
-        return flow_responses, proposal_md, model_file_for_gradio, screenshot_file_for_gradio
+        yield ("result", (proposal_md, model_file_for_gradio, screenshot_file_for_gradio))
 
-    def chat_interface(self, message: str, history: List[Dict[str, str]]):
-        """Processing function for Gradio's chat interface.
-           When type="messages", history is List[Dict[str, str]] from Gradio.
-        """
-        # The `history` parameter from Gradio (with type="messages") is already
-        # a list of dictionaries, e.g., [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}]
-        # This format is suitable for direct use in _execute_full_flow if its internal logic handles it,
-        # which it does by converting to HumanMessage/AIMessage.
-
-        # Call _execute_full_flow and get the response
-        flow_chat_responses, proposal_md_content, model_file_path, screenshot_file_path_or_obj = loop.run_until_complete(
-            self._execute_post_calculation(message, history, loop.run_until_complete(self._run_calculation_step(message, history)))
-        )
+app_instance = LangchainMCPApp()
 
-        # Create the final Gradio history for UI update
-        # Start with the existing history (which is List[Dict[str, str]])
-        updated_gradio_history = list(history) # Make a copy
-        
-        # Add the user's current message
-        updated_gradio_history.append({"role": "user", "content": message})
-        
-        # Add all new assistant messages from the flow
-        # flow_chat_responses is already a List[Dict[str, str]]
-        updated_gradio_history.extend(flow_chat_responses)
 
-        # Process to save proposal.md as a file
-        if not os.path.exists(MODEL_EXPORTS_DIR):
-            os.makedirs(MODEL_EXPORTS_DIR)
-        md_file_path = os.path.join(MODEL_EXPORTS_DIR, "proposal.md")
-        with open(md_file_path, "w", encoding="utf-8") as f:
-            f.write(proposal_md_content)
+def _cleanup_at_exit():
+    """Tears down MCP subprocesses on interpreter exit.
 
-        return updated_gradio_history, md_file_path, model_file_path, screenshot_file_path_or_obj
+    Without this the uvx/npx server processes leak across Gradio
+    debug-mode reloads, accumulating memory and file descriptors. The
+    server's event loop is already gone at atexit time, so the async
+    close runs on a fresh short-lived loop via asyncio.run — this is the
+    only sync-to-async bridge left in the module, and it runs exactly
+    once, so there is no loop churn to amortize.
+    """
+    if app_instance.exit_stack:
+        try:
+            asyncio.run(app_instance.shutdown_resources())
+        except Exception as e:
+            print(f"Error during atexit MCP cleanup: {e}")
 
-    async def _execute_full_flow(self, *args, **kwargs):
-        """Deprecated: Use new streaming-based flow with _execute_post_calculation."""
-        raise NotImplementedError("_execute_full_flow is deprecated. Use _execute_post_calculation instead.")
 
-app_instance = LangchainMCPApp()
+atexit.register(_cleanup_at_exit)
 
+@functools.lru_cache(maxsize=1)
 def gradio_app_interface():
+    """Builds (once) and returns the Gradio Blocks app.
+
+    Memoized so hot reloads or repeated imports reuse the constructed
+    Blocks graph instead of re-wiring every component and callback; the
+    closures capture the module-global app_instance either way.
+    """
     with gr.Blocks(title="Design & Modeling Agent") as demo:
         gr.Markdown("# Design & Modeling Agent")
         gr.Markdown("Performs design calculations, 3D modeling, and document generation based on user requests.")
@@ -623,80 +1345,123 @@ def gradio_app_interface():
                 container=False
             )
 
-        def handle_chat_submit(message, chat_history):
-            """Handles chat submission with streamed updates so that Step1 result appears before Step2 processing."""
-            # Step 1: Design calculation (synchronous wrapper)
-            calculation_specifications = loop.run_until_complete(
-                app_instance._run_calculation_step(message, chat_history)
-            )
-
-            # Build initial history to show Step1 result
-            step1_message = {
+        async def handle_chat_submit(message, chat_history, proposal_path, convo):
+            """Handles chat submission with streamed updates so that Step1 result appears before Step2 processing.
+
+            Async generator: Gradio drives it on the server's event loop,
+            so concurrent sessions multiplex instead of each pinning a
+            worker thread inside run_until_complete for the whole pipeline.
+            """
+            # Step 1: Design calculation, overlapped with modeling-agent
+            # warmup — MCP/FreeCAD startup hides behind the LLM round-trip.
+            # Tokens are streamed into the Step 1 bubble as they arrive.
+            warmup_task = asyncio.ensure_future(app_instance._warm_up_modeling_agent())
+
+            # Per-session conversation caches, created lazily on the first
+            # turn and carried in gr.State alongside the proposal path
+            if convo is None:
+                convo = ConversationState()
+
+            # One history list for the whole turn, mutated in place; each
+            # yield hands Gradio the same reference, so the per-stage
+            # full-list copies (O(N) each on long chats) are gone. Gradio's
+            # messages-mode state is per-session, so the handler owns the
+            # incoming list and can append to it directly; prior_len marks
+            # where the committed history ends for the calculation step.
+            history = chat_history if isinstance(chat_history, list) else list(chat_history)
+            prior_len = len(history)
+            history.append({"role": "user", "content": message})
+            history.append({"role": "assistant", "content": "**Step 1: Design Calculation in Progress...**"})
+            yield history, "", proposal_path, convo
+
+            calculation_specifications = ""
+            async for partial in app_instance._run_calculation_step(message, history, convo, prior_len):
+                calculation_specifications = partial
+                history[-1] = {
+                    "role": "assistant",
+                    "content": f"**Step 1: Design Calculation in Progress...**\n```\n{partial}\n```"
+                }
+                yield history, "", proposal_path, convo
+            await warmup_task
+
+            # Step 1 completion and the Step 2 placeholder go out in one
+            # frame: no await separates them, so a yield between the two
+            # would serialize an extra copy of the history that no client
+            # ever gets to see
+            history[-1] = {
                 "role": "assistant",
                 "content": f"**Step 1: Design Calculation Complete**\n```\n{calculation_specifications}\n```"
             }
-            updated_history = list(chat_history) + [
-                {"role": "user", "content": message},
-                step1_message,
-            ]
-
-            # First yield: immediately show Step1 result, no files yet
-            yield updated_history, "" # Removed proposal and screenshot file output
-
-            # Step2 progress messageを追加してすぐに表示
-            step2_progress_msg = {
+            history.append({
                 "role": "assistant",
                 "content": "**Step 2: 3D Modeling & Export in Progress...**\nCreating 3D model...."
-            }
-            history_step2 = updated_history + [step2_progress_msg]
-            yield history_step2, "" # Removed proposal and screenshot file output
-
-            # Step 2以降を実行
-            flow_responses, proposal_md_content, model_file_path, screenshot_file_path_or_obj = loop.run_until_complete(
-                app_instance._execute_post_calculation(message, chat_history, calculation_specifications)
-            )
+            })
+            yield history, "", proposal_path, convo # Removed proposal and screenshot file output
 
-            current_final_history = history_step2 + flow_responses
+            # Step 2以降を実行 — 各ステージの完了メッセージを受け取り次第表示
+            proposal_md_content = ""
+            model_file_path = None
+            screenshot_file_path_or_obj = None
+            write_task = None
+            async for kind, payload in app_instance._execute_post_calculation(message, chat_history, calculation_specifications):
+                if kind == "message":
+                    history.append(payload)
+                    yield history, "", proposal_path, convo
+                elif kind == "replace":
+                    history[-1] = payload
+                    yield history, "", proposal_path, convo
+                else:
+                    proposal_md_content, model_file_path, screenshot_file_path_or_obj = payload
+                    # Kick off the proposal disk write the moment the final
+                    # text exists; it overlaps the remaining UI updates
+                    write_task = asyncio.ensure_future(
+                        asyncio.to_thread(_write_proposal_file, proposal_md_content))
+
+            # proposal は per-session の一時ファイル (固定名の競合を回避)
+            if write_task is not None:
+                md_file_path = await write_task
+            else:
+                md_file_path = await asyncio.to_thread(_write_proposal_file, proposal_md_content)
+            if proposal_path and os.path.exists(proposal_path):
+                try:
+                    await asyncio.to_thread(os.remove, proposal_path)
+                except OSError as e:
+                    print(f"Error removing previous proposal file {proposal_path}: {e}")
+            proposal_path = md_file_path
 
-            # proposal.md を保存
-            if not os.path.exists(MODEL_EXPORTS_DIR):
-                os.makedirs(MODEL_EXPORTS_DIR)
-            md_file_path = os.path.join(MODEL_EXPORTS_DIR, "proposal.md")
-            with open(md_file_path, "w", encoding="utf-8") as f:
-                f.write(proposal_md_content)
-            current_final_history.append({
-                "role": "assistant",
-                "content": f"Saved proposal file (`{os.path.basename(md_file_path)}`) to `{MODEL_EXPORTS_DIR}` folder."
-            })
+            # Basenames computed once; the email block below reuses them
+            md_name = os.path.basename(md_file_path)
+            shot_name = os.path.basename(screenshot_file_path_or_obj) if screenshot_file_path_or_obj else None
 
+            saved_msgs = [{"role": "assistant", "content": f"Saved proposal file (`{md_name}`)."}]
             if model_file_path:
-                current_final_history.append({
+                saved_msgs.append({
                     "role": "assistant",
                     "content": f"Saved 3D model file (`{os.path.basename(model_file_path)}`) to `{MODEL_EXPORTS_DIR}` folder."
                 })
-
-            if screenshot_file_path_or_obj:
-                current_final_history.append({
+            if shot_name:
+                saved_msgs.append({
                     "role": "assistant",
-                    "content": f"Saved screenshot (`{os.path.basename(screenshot_file_path_or_obj)}`) to `{MODEL_EXPORTS_DIR}` folder."
+                    "content": f"Saved screenshot (`{shot_name}`) to `{MODEL_EXPORTS_DIR}` folder."
                 })
+            history.extend(saved_msgs)
 
             # --- Send Email ---
             if EMAIL_FUNCTION_AVAILABLE:
-                email_subject = f"{DEFAULT_EMAIL_SUBJECT} - {os.path.basename(md_file_path)}"
+                email_subject = f"{DEFAULT_EMAIL_SUBJECT} - {md_name}"
                 print(f"Attempting to send email with proposal '{md_file_path}' ...")
 
                 try:
-                    # Prepare email body from proposal.md content
-                    with open(md_file_path, "r", encoding="utf-8") as f_md:
-                        email_body = f_md.read()
+                    # Email body is the proposal text we already hold in
+                    # memory; no need to read the file back from disk
+                    email_body = proposal_md_content
 
                     # Build attachments list (screenshot only)
                     attachments = []
                     if screenshot_file_path_or_obj and os.path.exists(screenshot_file_path_or_obj):
                         attachments.append({
                             "file_path": screenshot_file_path_or_obj,
-                            "filename": os.path.basename(screenshot_file_path_or_obj),
+                            "filename": shot_name,
                             "content_type": "image/png",
                         })
 
@@ -706,85 +1471,119 @@ def gradio_app_interface():
                     else:
                         print("No attachments prepared (screenshot not found).")
 
-                    # Initialize EmailSender
-                    email_config = EmailConfig.from_config_file(DEFAULT_EMAIL_CONFIG_PATH)
-                    sender = EmailSender(email_config)
-
-                    success = sender.send_email(
-                        DEFAULT_EMAIL_TO,
-                        email_subject,
-                        email_body,
-                        attachments,
-                        cc_emails=None,
-                    )
+                    # Config load + SMTP send are blocking (disk read, TLS
+                    # handshake, upload of the attachment bytes); run them
+                    # on a worker thread so other sessions keep streaming
+                    def _send_sync():
+                        email_config = EmailConfig.from_config_file(DEFAULT_EMAIL_CONFIG_PATH)
+                        sender = EmailSender(email_config)
+                        return sender.send_email(
+                            DEFAULT_EMAIL_TO,
+                            email_subject,
+                            email_body,
+                            attachments,
+                            cc_emails=None,
+                        )
+
+                    success = await asyncio.to_thread(_send_sync)
 
                     if success:
                         print(f"Email sent successfully to {DEFAULT_EMAIL_TO} with proposal and attachments: {[os.path.basename(att['file_path']) for att in attachments] if attachments else 'None'}.")
-                        current_final_history.append({
+                        history.append({
                             "role": "assistant",
-                            "content": f"Proposal (`{os.path.basename(md_file_path)}`) と スクリーンショット (`{os.path.basename(screenshot_file_path_or_obj)}`) を {DEFAULT_EMAIL_TO} に送信しました。" if attachments else f"Proposal (`{os.path.basename(md_file_path)}`) を {DEFAULT_EMAIL_TO} に送信しました (添付スクリーンショットなし)。"
+                            "content": f"Proposal (`{md_name}`) と スクリーンショット (`{shot_name}`) を {DEFAULT_EMAIL_TO} に送信しました。" if attachments else f"Proposal (`{md_name}`) を {DEFAULT_EMAIL_TO} に送信しました (添付スクリーンショットなし)。"
                         })
                     else:
                         print("Failed to send email. Check configuration and logs.")
-                        current_final_history.append({
+                        history.append({
                             "role": "assistant",
                             "content": "メール送信に失敗しました。`config.json` とログをご確認ください。"
                         })
                 except Exception as e:
                     print(f"Error during email sending: {e}")
-                    current_final_history.append({
+                    history.append({
                         "role": "assistant",
                         "content": f"メール送信中にエラーが発生しました: {e}"
                     })
             else:
-                current_final_history.append({
+                history.append({
                     "role": "assistant",
                     "content": "メール送信機能が利用できません (email_sender.py のインポートに失敗)。"
                 })
             # --- End Send Email ---
 
             # Final yield: 完了後に全てのファイルを返す
-            yield current_final_history, "" # Removed proposal and screenshot file output
+            yield history, "", proposal_path, convo # Removed proposal and screenshot file output
+
+        proposal_path_state = gr.State(None)
+        convo_state = gr.State(None)
 
         msg_textbox.submit(
             handle_chat_submit,
-            [msg_textbox, chatbot],
-            [chatbot, msg_textbox] # Removed proposal_file_output, screenshot_file_output
+            [msg_textbox, chatbot, proposal_path_state, convo_state],
+            [chatbot, msg_textbox, proposal_path_state, convo_state] # Removed proposal_file_output, screenshot_file_output
+        )
+
+        # API-only batch endpoint (hidden from the UI): POST a list of
+        # queries and get the calculation results back in one batched call
+        with gr.Row(visible=False):
+            batch_queries_input = gr.JSON(label="Batch queries")
+            batch_results_output = gr.JSON(label="Batch results")
+            batch_btn = gr.Button("Run Batch", visible=False)
+
+        async def handle_batch(queries):
+            return await app_instance.run_batch_async(queries or [])
+
+        batch_btn.click(
+            handle_batch,
+            [batch_queries_input],
+            [batch_results_output],
+            api_name="batch",
         )
 
         clear_btn = gr.Button("Clear Chat & Output")
-        def clear_all():
-            # Clear proposal.md from model_exports directory
-            proposal_file_in_exports = os.path.join(MODEL_EXPORTS_DIR, "proposal.md")
-            if os.path.exists(proposal_file_in_exports):
-                try:
-                    os.remove(proposal_file_in_exports)
-                    print(f"Removed {proposal_file_in_exports}")
-                except Exception as e:
-                    print(f"Error removing {proposal_file_in_exports}: {e}")
-            
-            # Legacy proposal.md in root (if any)
-            if os.path.exists("proposal.md"):
+        def clear_all(proposal_path):
+            # The session's conversation caches are dropped by returning
+            # None for convo_state below; other sessions are untouched
+
+            # Remove this session's proposal temp file, if one was written
+            if proposal_path and os.path.exists(proposal_path):
                 try:
-                    os.remove("proposal.md")
-                    print("Removed proposal.md from root directory.")
+                    os.remove(proposal_path)
+                    print(f"Removed {proposal_path}")
                 except Exception as e:
-                    print(f"Error removing proposal.md from root: {e}")
-
-            # Clean up any exported models and screenshots in the 'model_exports' directory
-            if os.path.exists(MODEL_EXPORTS_DIR):
-                for f_name in os.listdir(MODEL_EXPORTS_DIR):
-                    file_path = os.path.join(MODEL_EXPORTS_DIR, f_name)
-                    # Keep proposal.md deletion separate above, here focus on other artifacts
-                    if f_name != "proposal.md" and f_name.endswith((".step", ".stl", ".iges", ".brep", ".png")):
-                        try:
-                            os.remove(file_path)
-                            print(f"Removed exported file: {file_path}")
-                        except Exception as e:
-                            print(f"Error removing file {file_path}: {e}")
+                    print(f"Error removing {proposal_path}: {e}")
+
+            # Clean up any exported models and screenshots in the
+            # 'model_exports' directory. scandir yields DirEntry objects
+            # whose type check reuses metadata from the directory read
+            # instead of a separate stat per file, and the joined path
+            # comes for free on entry.path
+            try:
+                with os.scandir(MODEL_EXPORTS_DIR) as it:
+                    for entry in it:
+                        if entry.is_file() and entry.name.endswith(_EXPORT_SUFFIXES):
+                            try:
+                                os.unlink(entry.path)
+                                print(f"Removed exported file: {entry.path}")
+                            except OSError as e:
+                                print(f"Error removing file {entry.path}: {e}")
+            except FileNotFoundError:
+                pass
+
+            return [], "", None, None # Clear chatbot, textbox, proposal path, and conversation state
+        clear_btn.click(clear_all, [proposal_path_state], [chatbot, msg_textbox, proposal_path_state, convo_state]) # Removed proposal_file_output, screenshot_file_output
+
+        # Prewarm the MCP subprocesses and the Anthropic connection pool
+        # while the UI is loading; both are idempotent/best-effort, so
+        # repeat page loads after the first are cheap no-ops
+        async def _startup_warmup():
+            await asyncio.gather(
+                app_instance._warm_up_modeling_agent(),
+                app_instance._warm_up_llm_pool(),
+            )
 
-            return [], "" # Clear chatbot, clear textbox (removed proposal and screenshot file outputs)
-        clear_btn.click(clear_all, None, [chatbot, msg_textbox]) # Removed proposal_file_output, screenshot_file_output
+        demo.load(_startup_warmup)
 
     return demo
 
@@ -793,12 +1592,15 @@ if __name__ == "__main__":
         print("Warning: API keys (e.g., OPENAI_API_KEY, ANTHROPIC_API_KEY) not found in environment variables.")
         print("Please set them in your .env file or environment for the LLM to work.")
 
-    # Attempt initialization once when the application starts
-    # loop.run_until_complete(app_instance._initialize_client_and_agent())
-    # Either have Gradio call this automatically on startup, or initialize on the first message
+    # Startup initialization happens via demo.load (MCP + LLM warmup)
+    # once the UI is up; the first message would also trigger it lazily.
 
     interface = gradio_app_interface()
-    interface.launch(debug=True)
-    # Cleanup when the application exits
-    # loop.run_until_complete(app_instance.exit_stack.aclose() if app_instance.exit_stack else asyncio.sleep(0))
-    # Depends on how Gradio handles exit processing
+    # Queue with a shared concurrency pool: handlers are async, so each
+    # slot is a coroutine on the server loop rather than a worker thread,
+    # and multiple sessions progress through Steps 1-3 concurrently.
+    # debug=True serialized handler execution and doubled logging.
+    interface.queue(default_concurrency_limit=8, max_size=64)
+    interface.launch(debug=False, show_error=True)
+    # Cleanup when the application exits is handled by the atexit hook
+    # registered next to app_instance (closes the MCP exit stack).